@@ -0,0 +1,181 @@
+"""
+Generators for valid puzzle inputs of any size. The first argument of every generator controls how
+big the input is, and the ones that use randomness take a `seed` so runs are reproducible.
+"""
+
+import random
+import string
+from itertools import accumulate, islice
+from typing import List, Tuple
+
+ITEMS = string.ascii_lowercase + string.ascii_uppercase
+
+
+def generate_day1(n_elves: int, seed: int = 0) -> str:
+    """N elves carrying between 1 and 15 items each."""
+    rng = random.Random(seed)
+    return "\n\n".join(
+        "\n".join(str(rng.randint(1000, 60000)) for _ in range(rng.randint(1, 15)))
+        for _ in range(n_elves)
+    )
+
+
+def generate_day2(n_rounds: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "\n".join(
+        f"{rng.choice('ABC')} {rng.choice('XYZ')}" for _ in range(n_rounds)
+    )
+
+
+def _generate_rucksack_group(rng: random.Random, compartment_size: int) -> List[str]:
+    """
+    Generates 3 rucksacks that share exactly one badge item, where each rucksack has exactly one item
+    in both of its compartments.
+    """
+    badge = rng.choice(ITEMS)
+    others = rng.sample([c for c in ITEMS if c != badge], len(ITEMS) - 1)
+    # every rucksack draws from its own pool of items so the badge is the only item they share
+    pool_size = len(others) // 3
+    pools = [others[i * pool_size : (i + 1) * pool_size] for i in range(3)]
+
+    def _generate_rucksack(pool: List[str]) -> str:
+        shared, left_pool, right_pool = pool[0], pool[1::2], pool[2::2]
+        left = [shared, badge] + rng.choices(left_pool, k=compartment_size - 2)
+        right = [shared] + rng.choices(right_pool, k=compartment_size - 1)
+        rng.shuffle(left)
+        rng.shuffle(right)
+        return "".join(left + right)
+
+    return [_generate_rucksack(pool) for pool in pools]
+
+
+def generate_day3(n_groups: int, compartment_size: int = 16, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "\n".join(
+        rucksack
+        for _ in range(n_groups)
+        for rucksack in _generate_rucksack_group(rng, compartment_size)
+    )
+
+
+def generate_day4(n_pairs: int, max_section: int = 99, seed: int = 0) -> str:
+    rng = random.Random(seed)
+
+    def _generate_assignment() -> str:
+        start = rng.randint(1, max_section)
+        return f"{start}-{rng.randint(start, max_section)}"
+
+    return "\n".join(
+        f"{_generate_assignment()},{_generate_assignment()}" for _ in range(n_pairs)
+    )
+
+
+def generate_day5(
+    n_moves: int, stack_height: int = 50, n_stacks: int = 9, seed: int = 0
+) -> str:
+    """
+    Stacks that all start `stack_height` crates tall followed by `n_moves` moves. Moves always leave at
+    least one crate behind, so every stack has a top crate at the end.
+    """
+    assert n_stacks <= 9, "stack labels are a single digit"
+    assert stack_height >= 2 and n_stacks >= 2
+    rng = random.Random(seed)
+
+    diagram_rows = [
+        " ".join(f"[{rng.choice(string.ascii_uppercase)}]" for _ in range(n_stacks))
+        for _ in range(stack_height)
+    ]
+    labels = " ".join(f" {i + 1} " for i in range(n_stacks))
+
+    def _next_move(
+        state: Tuple[Tuple[int, ...], str], _
+    ) -> Tuple[Tuple[int, ...], str]:
+        """Picks a random valid move given the stack heights, returning the new heights and the move."""
+        heights, _ = state
+        from_i = rng.choice([i for i, h in enumerate(heights) if h > 1])
+        to_i = rng.choice([i for i in range(n_stacks) if i != from_i])
+        amount = rng.randint(1, min(heights[from_i] - 1, 10))
+
+        new_heights = tuple(
+            h - amount if i == from_i else h + amount if i == to_i else h
+            for i, h in enumerate(heights)
+        )
+        return new_heights, f"move {amount} from {from_i + 1} to {to_i + 1}"
+
+    states = accumulate(
+        range(n_moves), _next_move, initial=((stack_height,) * n_stacks, "")
+    )
+    moves = [move for _, move in islice(states, 1, None)]
+
+    return "\n".join(diagram_rows + [labels, ""] + moves)
+
+
+def generate_day6(length: int, seed: int = 0) -> str:
+    """
+    A datastream where both markers only appear at the very end, so the whole stream is scanned.
+    """
+    rng = random.Random(seed)
+    noise = "".join(rng.choices("abc", k=length))
+    return noise + "defghijklmnopq"
+
+
+def generate_day7(depth: int, dirs_per_level: int = 3, files_per_dir: int = 3) -> str:
+    """
+    A transcript that walks down a chain of `depth` nested directories. Every directory on the chain
+    also has sibling leaf directories, which are visited on the way back up.
+    """
+
+    def _ls(level: int) -> List[str]:
+        return (
+            ["$ ls"]
+            + [f"dir d{level}_{i}" for i in range(dirs_per_level)]
+            + [f"{1000 * (level + i + 1)} f{i}.txt" for i in range(files_per_dir)]
+        )
+
+    descent = [
+        line
+        for level in range(1, depth + 1)
+        for line in [f"$ cd d{level - 1}_0"] + _ls(level)
+    ]
+    # the deepest directory visits all of its children, the others visit the ones not on the chain
+    ascent = [
+        line
+        for level in range(depth, -1, -1)
+        for line in [
+            sibling_line
+            for i in range(0 if level == depth else 1, dirs_per_level)
+            for sibling_line in [
+                f"$ cd d{level}_{i}",
+                "$ ls",
+                f"{100 * (i + 1)} leaf.txt",
+                "$ cd ..",
+            ]
+        ]
+        + (["$ cd .."] if level else [])
+    ]
+
+    # a big file in the root so there is always something to delete for part 2
+    return "\n".join(["$ cd /"] + _ls(0) + ["45000000 big.bin"] + descent + ascent)
+
+
+def generate_day8(width: int, height: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "\n".join(
+        "".join(rng.choices(string.digits, k=width)) for _ in range(height)
+    )
+
+
+def generate_day9(n_moves: int, max_steps: int = 20, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return "\n".join(
+        f"{rng.choice('UDLR')} {rng.randint(1, max_steps)}" for _ in range(n_moves)
+    )
+
+
+def generate_day10(n_instructions: int, seed: int = 0) -> str:
+    """Needs at least 146 instructions so the program runs past the last signal strength cycle."""
+    rng = random.Random(seed)
+    return "\n".join(
+        "noop" if rng.random() < 0.3 else f"addx {rng.randint(-10, 10)}"
+        for _ in range(n_instructions)
+    )
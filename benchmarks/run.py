@@ -0,0 +1,279 @@
+"""
+Times parsing, part 1 and part 2 of every day separately on generated inputs and saves the timings as
+JSON. Passing an earlier result file with --compare reports the steps that got slower.
+
+Usage: python benchmarks/run.py [--days day1 day8] [--scale 2] [--output results.json]
+                                [--compare baseline.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Dict, List
+
+import generators
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, f"day{n}") for n in range(1, 11)]
+
+import day1  # noqa: E402
+import day2  # noqa: E402
+import day3  # noqa: E402
+import day4  # noqa: E402
+import day5  # noqa: E402
+import day6  # noqa: E402
+import day7  # noqa: E402
+import day8  # noqa: E402
+import day9  # noqa: E402
+import day10  # noqa: E402
+
+
+@dataclass(frozen=True)
+class DayBenchmark:
+    name: str
+    # builds an input for a scale factor, 1 gives an input that takes about a second to solve
+    generate: Callable[[float], str]
+    parse: Callable[[str], Any]
+    part1: Callable[[Any], Any]
+    part2: Callable[[Any], Any]
+
+
+def _scaled(n: int, scale: float) -> int:
+    return max(1, int(n * scale))
+
+
+def _parse_day3_sets(text: str) -> List[str]:
+    return text.split("\n")
+
+
+def _solve_day3_sets_part1(lines: List[str]) -> int:
+    common_characters = map(day3.find_common_character_in_both_halves, lines)
+    return sum(map(day3.find_character_priority, common_characters))
+
+
+def _solve_day3_sets_part2(lines: List[str]) -> int:
+    groups = day3.chunker(lines, 3)
+    common_characters = [day3.find_common_character(*group) for group in groups]
+    return sum(map(day3.find_character_priority, common_characters))
+
+
+BENCHMARKS = [
+    DayBenchmark(
+        "day1",
+        lambda scale: generators.generate_day1(_scaled(100_000, scale)),
+        lambda text: list(day1.iter_elf_loads_in_buffer(text.encode("ascii"))),
+        lambda loads: day1.top_k_elf_loads(loads, 1)[0],
+        lambda loads: sum(day1.top_k_elf_loads(loads, 3)),
+    ),
+    DayBenchmark(
+        "day2",
+        lambda scale: generators.generate_day2(_scaled(2_000_000, scale)),
+        day2.count_rounds,
+        lambda counts: day2.score_guide(counts, day2.SCORE_TABLE_1),
+        lambda counts: day2.score_guide(counts, day2.SCORE_TABLE_2),
+    ),
+    DayBenchmark(
+        "day3_sets",
+        lambda scale: generators.generate_day3(_scaled(50_000, scale)),
+        _parse_day3_sets,
+        _solve_day3_sets_part1,
+        _solve_day3_sets_part2,
+    ),
+    DayBenchmark(
+        "day4",
+        lambda scale: generators.generate_day4(_scaled(100_000, scale)),
+        lambda text: day4.parse_assignments(text.encode("ascii")),
+        lambda pairs: sum(a1.contains(a2) or a2.contains(a1) for a1, a2 in pairs),
+        lambda pairs: sum(a1.overlaps(a2) for a1, a2 in pairs),
+    ),
+    DayBenchmark(
+        "day5",
+        lambda scale: generators.generate_day5(_scaled(20_000, scale), 500),
+        lambda text: day5.parse_input(text.encode("ascii")),
+        lambda parsed: day5.trace_top_crates(*parsed),
+        lambda parsed: day5.trace_top_crates(*parsed, is_9001=True),
+    ),
+    DayBenchmark(
+        "day6",
+        lambda scale: generators.generate_day6(_scaled(100_000, scale)),
+        lambda text: text.encode("ascii"),
+        lambda data: day6.find_markers(data, {4})[4],
+        lambda data: day6.find_markers(data, {14})[14],
+    ),
+    DayBenchmark(
+        "day7",
+        lambda scale: generators.generate_day7(_scaled(30_000, scale)),
+        lambda text: day7.FlatDirectoryTree.from_lines(text.split("\n")),
+        day7.sum_small_directory_sizes,
+        lambda tree: tree.total_sizes[day7.find_directory_to_delete(tree)],
+    ),
+    DayBenchmark(
+        "day8",
+        lambda scale: generators.generate_day8(
+            _scaled(500, scale), _scaled(500, scale)
+        ),
+        lambda text: day8.Grid.from_digits(text.encode("ascii")),
+        day8.tree_counter,
+        day8.find_max_scenic_score,
+    ),
+    DayBenchmark(
+        "day9",
+        lambda scale: generators.generate_day9(_scaled(1_500, scale)),
+        lambda text: day9.parse_move_commands_in_bulk(text.encode("ascii")),
+        partial(day9.count_tail_positions, n_knots=2),
+        partial(day9.count_tail_positions, n_knots=10),
+    ),
+    DayBenchmark(
+        "day10",
+        lambda scale: generators.generate_day10(_scaled(5_000, scale)),
+        lambda text: day10.run_program(
+            day10.parse_instructions_in_bulk(text.encode("ascii"))
+        ),
+        day10.sum_signal_strengths,
+        day10.render_crt,
+    ),
+]
+
+if day3.np is not None:
+    BENCHMARKS.append(
+        DayBenchmark(
+            "day3_masks",
+            lambda scale: generators.generate_day3(_scaled(50_000, scale)),
+            lambda text: day3.encode_rucksack_masks(text.split("\n"), 3),
+            lambda masks: int(day3.common_item_priorities(masks[0]).sum()),
+            lambda masks: int(day3.common_item_priorities(masks[1]).sum()),
+        )
+    )
+
+if day4.np is not None:
+    BENCHMARKS.append(
+        DayBenchmark(
+            "day4_columns",
+            lambda scale: generators.generate_day4(_scaled(100_000, scale)),
+            day4.AssignmentColumns.from_str,
+            day4.AssignmentColumns.count_containing,
+            day4.AssignmentColumns.count_overlapping,
+        )
+    )
+
+
+if day8.np is not None:
+    BENCHMARKS.append(
+        DayBenchmark(
+            "day8_mask",
+            lambda scale: generators.generate_day8(
+                _scaled(2_000, scale), _scaled(2_000, scale)
+            ),
+            lambda text: day8.load_heights(text.encode("ascii")),
+            lambda heights: int(day8.visibility_mask(heights).sum()),
+            # the mask only covers part 1
+            lambda heights: None,
+        )
+    )
+
+
+def _best_time(f: Callable[[], Any], repeat: int) -> float:
+    """Returns the fastest of `repeat` runs of `f` in seconds."""
+
+    def _time_once(_) -> float:
+        start = time.perf_counter()
+        f()
+        return time.perf_counter() - start
+
+    return min(map(_time_once, range(repeat)))
+
+
+def run_benchmark(benchmark: DayBenchmark, scale: float, repeat: int) -> Dict:
+    text = benchmark.generate(scale)
+    parsed = benchmark.parse(text)
+
+    return {
+        "input_bytes": len(text),
+        "parse": _best_time(lambda: benchmark.parse(text), repeat),
+        "part1": _best_time(lambda: benchmark.part1(parsed), repeat),
+        "part2": _best_time(lambda: benchmark.part2(parsed), repeat),
+    }
+
+
+def find_regressions(baseline: Dict, current: Dict, tolerance: float) -> List[str]:
+    """Lists the steps that are more than `tolerance` (0.1 is 10%) slower than in the baseline."""
+    return [
+        f"{name} {step}: {before:.4f}s -> {after:.4f}s ({after / before:.2f}x)"
+        for name, timings in current["results"].items()
+        if name in baseline["results"]
+        and baseline["results"][name]["input_bytes"] == timings["input_bytes"]
+        for step, after in timings.items()
+        if step != "input_bytes"
+        for before in [baseline["results"][name][step]]
+        # steps that take less than a millisecond are too noisy to compare
+        if after > before * (1 + tolerance) and after - before > 0.001
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--days",
+        nargs="*",
+        choices=[benchmark.name for benchmark in BENCHMARKS],
+        help="benchmarks to run, all of them by default",
+    )
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--compare", help="earlier result file to check against")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    benchmarks = [
+        benchmark
+        for benchmark in BENCHMARKS
+        if not args.days or benchmark.name in args.days
+    ]
+
+    def _run_and_report(benchmark: DayBenchmark) -> Dict:
+        timings = run_benchmark(benchmark, args.scale, args.repeat)
+        print(
+            f"{benchmark.name:<13} {timings['input_bytes']:>11} bytes  "
+            f"parse {timings['parse']:.4f}s  "
+            f"part1 {timings['part1']:.4f}s  "
+            f"part2 {timings['part2']:.4f}s"
+        )
+        return timings
+
+    current = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "repeat": args.repeat,
+        "results": {
+            benchmark.name: _run_and_report(benchmark) for benchmark in benchmarks
+        },
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"saved results to {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+
+        regressions = find_regressions(baseline, current, args.tolerance)
+        print(
+            "\n".join(["regressions:"] + regressions)
+            if regressions
+            else "no regressions"
+        )
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
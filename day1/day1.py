@@ -1,15 +1,118 @@
+import heapq
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from functools import partial, reduce
+from itertools import chain, groupby, pairwise
+from typing import Iterable, Iterator, List, Optional, Tuple
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from puzzle_input import Buffer, input_path, iter_records, map_input  # noqa: E402
 
-with open(os.path.join(os.path.dirname(__file__), "input.txt"), "r") as f:
-    text = f.read()
 
-elf_loads = [
-    sum(int(item) for item in inventory.split("\n")) for inventory in text.split("\n\n")
-]
+def iter_elf_loads(lines: Iterable[str]) -> Iterator[int]:
+    """
+    Lazily yields the total calories carried by each elf. Only one blank-line separated inventory is
+    held in memory at a time, so `lines` can be an open file of any size.
+    """
+    inventories = groupby(lines, key=lambda line: bool(line.strip()))
+    return (
+        sum(int(item) for item in inventory)
+        for is_inventory, inventory in inventories
+        if is_inventory
+    )
 
-# part 1
-print(max(elf_loads))
 
-# part 2
-print(sum(sorted(elf_loads, reverse=True)[:3]))
+def iter_elf_loads_in_buffer(data: Buffer) -> Iterator[int]:
+    """Like `iter_elf_loads`, but sums the inventories straight out of a (memory mapped) buffer."""
+    # a record only holds whitespace separated numbers, so splitting it is cheaper than a regex
+    return (sum(map(int, bytes(record).split())) for record in iter_records(data))
+
+
+def _push_bounded(heap: List[int], load: int, k: int) -> List[int]:
+    """Keeps `heap` as a min-heap of the `k` largest loads seen so far."""
+    if len(heap) < k:
+        heapq.heappush(heap, load)
+    elif load > heap[0]:
+        heapq.heapreplace(heap, load)
+
+    return heap
+
+
+def top_k_elf_loads(elf_loads: Iterable[int], k: int) -> List[int]:
+    """
+    Returns the `k` largest loads in descending order from a single pass over `elf_loads`. The first
+    element is the max load. Memory is O(k) no matter how many loads there are.
+    """
+    assert k >= 1, f"k must be positive, got {k=}"
+    return sorted(reduce(partial(_push_bounded, k=k), elf_loads, []), reverse=True)
+
+
+def find_shard_ranges(path: str, n_shards: int) -> List[Tuple[int, int]]:
+    """
+    Splits the file at `path` into at most `n_shards` byte ranges of roughly equal size. Every range
+    boundary sits just after a blank line ("\n\n") so no inventory is split across two ranges.
+    """
+    assert n_shards >= 1, f"n_shards must be positive, got {n_shards=}"
+    size = os.path.getsize(path)
+
+    if not size:
+        return []
+
+    with map_input(path) as data:
+        separators = [
+            data.find(b"\n\n", size * i // n_shards) for i in range(1, n_shards)
+        ]
+
+    cuts = [0] + [sep + 2 if sep != -1 else size for sep in separators] + [size]
+    return [(start, end) for start, end in pairwise(cuts) if start < end]
+
+
+def _top_k_elf_loads_in_range(
+    path: str, byte_range: Tuple[int, int], k: int
+) -> List[int]:
+    """Worker for `parallel_top_k_elf_loads`: streams only the inventories inside `byte_range`."""
+    start, end = byte_range
+    with map_input(path) as data:
+        shard = memoryview(data)[start:end]
+        try:
+            top_loads = top_k_elf_loads(iter_elf_loads_in_buffer(shard), k)
+        except BaseException:
+            # the traceback still holds the record scanner and its export of the view, releasing the
+            # view would then hide the error behind a BufferError, like closing the mapping would
+            with suppress(BufferError):
+                shard.release()
+            raise
+        # the mapping can only be closed once no views into it are left
+        shard.release()
+        return top_loads
+
+
+def parallel_top_k_elf_loads(
+    path: str, k: int, n_workers: Optional[int] = None
+) -> List[int]:
+    """
+    Same result as `top_k_elf_loads(iter_elf_loads(f), k)`, but the file is sharded on record
+    boundaries and every shard is reduced in its own process. The per-shard top-k lists are merged
+    at the end.
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    shard_ranges = find_shard_ranges(path, n_workers)
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        shard_top_loads = executor.map(
+            partial(_top_k_elf_loads_in_range, path, k=k), shard_ranges
+        )
+        return top_k_elf_loads(chain.from_iterable(shard_top_loads), k)
+
+
+if __name__ == "__main__":
+    with map_input(input_path(__file__)) as data:
+        top_loads = top_k_elf_loads(iter_elf_loads_in_buffer(data), 3)
+
+    # part 1
+    print(top_loads[0])
+
+    # part 2
+    print(sum(top_loads))
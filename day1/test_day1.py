@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from day1 import (
+    find_shard_ranges,
+    iter_elf_loads,
+    parallel_top_k_elf_loads,
+    top_k_elf_loads,
+)
+
+
+def _write_inventories(path, rng: random.Random, n_elves: int) -> str:
+    inventories = [
+        "\n".join(str(rng.randint(1, 9999)) for _ in range(rng.randint(1, 5)))
+        for _ in range(n_elves)
+    ]
+    path.write_text("\n\n".join(inventories) + "\n")
+    return str(path)
+
+
+@pytest.mark.parametrize("n_workers", [1, 2, 5])
+@pytest.mark.parametrize("k", [1, 3, 50])
+def test_parallel_matches_a_single_pass(tmp_path, n_workers, k):
+    path = _write_inventories(tmp_path / "input.txt", random.Random(k), 40)
+
+    with open(path) as f:
+        expected = top_k_elf_loads(iter_elf_loads(f), k)
+    assert parallel_top_k_elf_loads(path, k, n_workers) == expected
+
+
+def test_shards_cover_the_file_on_record_boundaries(tmp_path):
+    path = _write_inventories(tmp_path / "input.txt", random.Random(1), 100)
+    data = open(path, "rb").read()
+    ranges = find_shard_ranges(path, 7)
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert all(data[start - 2 : start] == b"\n\n" for start, _ in ranges[1:])
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text("")
+
+    assert find_shard_ranges(str(path), 4) == []
+    assert parallel_top_k_elf_loads(str(path), 3, 2) == []
+
+
+def test_parse_errors_are_not_hidden(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_text("1\n2\n\nx\n")
+
+    with pytest.raises(ValueError, match="invalid literal"):
+        parallel_top_k_elf_loads(str(path), 3, 1)
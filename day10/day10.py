@@ -1,9 +1,14 @@
 import enum
 import os
+import re
+import sys
 from dataclasses import dataclass
 from functools import reduce
 from typing import List, Self, Optional
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from puzzle_input import Buffer, extract_ints, input_path, map_input  # noqa: E402
+
 
 class InstructionType(enum.Enum):
     NOOP = 0
@@ -81,28 +86,6 @@ def apply_instruction_to_states(
     return cycle_states + new_states
 
 
-with open(os.path.join(os.path.dirname(__file__), "input.txt"), "r") as f:
-    text = f.read()
-
-lines = text.split("\n")
-instructions = [Instruction.from_str(line) for line in lines]
-initial_cpu_states = [CpuCycleState(0, None, CpuState(1), CpuState(1))]
-
-cycle_history = reduce(apply_instruction_to_states, instructions, initial_cpu_states)
-
-# part 1
-signal_strength_cycles = {20, 60, 100, 140, 180, 220}
-
-signal_strengths = [
-    cycle_state.cycle * cycle_state.state_during.x_reg
-    for cycle_state in cycle_history
-    if cycle_state.cycle in signal_strength_cycles
-]
-
-result1 = sum(signal_strengths)
-print(result1)
-
-# part 2
 def get_pixel_state_during_each_cycle(cycle_history: List[CpuCycleState]) -> List[bool]:
     """Returns a list of pixel states during each cycle. True means lit, False means unlit."""
 
@@ -119,11 +102,64 @@ def chunker(iterable, chunk_size):
     return [iterable[i : i + chunk_size] for i in range(0, n, chunk_size)]
 
 
-pixel_states_for_each_cycle = get_pixel_state_during_each_cycle(cycle_history[1:])
-output_chars = [
-    "#" if pixel_is_lit else "." for pixel_is_lit in pixel_states_for_each_cycle
-]
-output_chars = "".join(output_chars)
-output_lines = chunker(output_chars, 40)
-result2 = "\n".join(output_lines)
-print(result2)
+def parse_instructions_in_bulk(data: Buffer) -> List[Instruction]:
+    """
+    Reads all instruction names and all addx operands in one scan each instead of splitting every
+    line. Only addx takes an operand, so the operands are handed out to them in order.
+    """
+    names = re.findall(rb"noop|addx", data)
+    operands = iter(extract_ints(data))
+
+    instructions = [
+        (
+            Instruction(InstructionType.ADDX, next(operands), 2)
+            if name == b"addx"
+            else Instruction(InstructionType.NOOP, 0, 1)
+        )
+        for name in names
+    ]
+    assert next(operands, None) is None, "found more operands than addx instructions"
+
+    return instructions
+
+
+def run_program(instructions: List[Instruction]) -> List[CpuCycleState]:
+    initial_cpu_states = [CpuCycleState(0, None, CpuState(1), CpuState(1))]
+    return reduce(apply_instruction_to_states, instructions, initial_cpu_states)
+
+
+def sum_signal_strengths(cycle_history: List[CpuCycleState]) -> int:
+    signal_strength_cycles = {20, 60, 100, 140, 180, 220}
+
+    signal_strengths = [
+        cycle_state.cycle * cycle_state.state_during.x_reg
+        for cycle_state in cycle_history
+        if cycle_state.cycle in signal_strength_cycles
+    ]
+
+    return sum(signal_strengths)
+
+
+def render_crt(cycle_history: List[CpuCycleState]) -> str:
+    pixel_states_for_each_cycle = get_pixel_state_during_each_cycle(cycle_history[1:])
+    output_chars = [
+        "#" if pixel_is_lit else "." for pixel_is_lit in pixel_states_for_each_cycle
+    ]
+    output_chars = "".join(output_chars)
+    output_lines = chunker(output_chars, 40)
+    return "\n".join(output_lines)
+
+
+if __name__ == "__main__":
+    with map_input(input_path(__file__)) as data:
+        instructions = parse_instructions_in_bulk(data)
+
+    cycle_history = run_program(instructions)
+
+    # part 1
+    result1 = sum_signal_strengths(cycle_history)
+    print(result1)
+
+    # part 2
+    result2 = render_crt(cycle_history)
+    print(result2)
@@ -1,6 +1,9 @@
 import enum
 import os
-from typing import Tuple
+import sys
+from dataclasses import dataclass
+from functools import partial, reduce
+from typing import BinaryIO, Callable, Dict, Tuple, Union
 
 
 class Choice(enum.Enum):
@@ -100,17 +103,88 @@ def parse_line_2(line: str) -> Tuple[Choice, Choice]:
     return they_played, you_played
 
 
-with open(os.path.join(os.path.dirname(__file__), "input.txt"), "r") as f:
-    text = f.read()
+# every possible line of the strategy guide, e.g. "A X"
+ROUNDS = [f"{they} {you}" for they in "ABC" for you in "XYZ"]
 
-lines = text.split("\n")
 
-# part 1
-rounds = map(parse_line_1, lines)
-part1_result = sum(map(lambda x: calculate_your_score(*x), rounds))
-print(part1_result)
+def build_score_table(
+    parse_line: Callable[[str], Tuple[Choice, Choice]],
+) -> Dict[str, int]:
+    """Precomputes your score for each of the 9 possible rounds under a parsing strategy."""
+    return {
+        round_str: calculate_your_score(*parse_line(round_str)) for round_str in ROUNDS
+    }
+
+
+SCORE_TABLE_1 = build_score_table(parse_line_1)
+SCORE_TABLE_2 = build_score_table(parse_line_2)
+
+
+def count_rounds(text: Union[str, bytes]) -> Dict[str, int]:
+    """
+    Counts how often each round occurs in the guide, given as text or as ASCII bytes. Each count is a
+    single `count` scan, so no Python code runs per line. Rounds can not overlap across lines since
+    they are separated by newlines.
+    """
+    if isinstance(text, str):
+        return {round_str: text.count(round_str) for round_str in ROUNDS}
+    return {round_str: text.count(round_str.encode("ascii")) for round_str in ROUNDS}
+
+
+def score_guide(round_counts: Dict[str, int], score_table: Dict[str, int]) -> int:
+    return sum(
+        count * score_table[round_str] for round_str, count in round_counts.items()
+    )
+
+
+@dataclass(frozen=True)
+class _GuideScanState:
+    """Running totals for both strategies plus the unfinished line at the end of the last chunk."""
+
+    partial_line: bytes
+    score1: int
+    score2: int
+
+
+def _score_both(data: bytes) -> Tuple[int, int]:
+    """Scores the complete lines in `data` for both strategies."""
+    round_counts = count_rounds(data)
+    return score_guide(round_counts, SCORE_TABLE_1), score_guide(
+        round_counts, SCORE_TABLE_2
+    )
+
+
+def _scan_chunk(state: _GuideScanState, chunk: bytes) -> _GuideScanState:
+    data = state.partial_line + chunk
+    # only score up to the last newline; whatever follows may continue in the next chunk
+    cut = data.rfind(b"\n") + 1
+    score1, score2 = _score_both(data[:cut])
+    return _GuideScanState(data[cut:], state.score1 + score1, state.score2 + score2)
+
+
+def score_guide_stream(stream: BinaryIO, chunk_size: int = 1 << 16) -> Tuple[int, int]:
+    """
+    Scores a guide for both strategies in a single pass over `stream`, reading `chunk_size` bytes at a
+    time. Lines that span chunk boundaries are carried over, so memory is bounded by the chunk size.
+    """
+    chunks = iter(partial(stream.read, chunk_size), b"")
+    state = reduce(_scan_chunk, chunks, _GuideScanState(b"", 0, 0))
+    score1, score2 = _score_both(state.partial_line)
+    return state.score1 + score1, state.score2 + score2
+
+
+if __name__ == "__main__":
+    # stream a guide of any size from a file, or from stdin when given "-", the puzzle input otherwise
+    if sys.argv[1:] == ["-"]:
+        part1_result, part2_result = score_guide_stream(sys.stdin.buffer)
+    else:
+        default_path = os.path.join(os.path.dirname(__file__), "input.txt")
+        path = sys.argv[1] if len(sys.argv) > 1 else default_path
+        with open(path, "rb") as f:
+            part1_result, part2_result = score_guide_stream(f)
+
+    # part 1
+    print(part1_result)
 
-# part 2
-rounds = map(parse_line_2, lines)
-part2_result = sum(map(lambda x: calculate_your_score(*x), rounds))
-print(part2_result)
+    # part 2
+    print(part2_result)
@@ -0,0 +1,36 @@
+import io
+import random
+
+import pytest
+
+from day2 import (
+    ROUNDS,
+    SCORE_TABLE_1,
+    SCORE_TABLE_2,
+    count_rounds,
+    score_guide,
+    score_guide_stream,
+)
+
+SAMPLE = "A Y\nB X\nC Z"
+
+
+def test_sample():
+    round_counts = count_rounds(SAMPLE)
+
+    assert score_guide(round_counts, SCORE_TABLE_1) == 15
+    assert score_guide(round_counts, SCORE_TABLE_2) == 12
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 7, 1 << 16])
+@pytest.mark.parametrize("trailing_newline", [False, True])
+def test_stream_matches_counting_the_whole_guide(chunk_size, trailing_newline):
+    rng = random.Random(chunk_size)
+    text = "\n".join(rng.choice(ROUNDS) for _ in range(200)) + "\n" * trailing_newline
+    round_counts = count_rounds(text)
+
+    assert count_rounds(text.encode("ascii")) == round_counts
+    assert score_guide_stream(io.BytesIO(text.encode("ascii")), chunk_size) == (
+        score_guide(round_counts, SCORE_TABLE_1),
+        score_guide(round_counts, SCORE_TABLE_2),
+    )
@@ -1,5 +1,14 @@
 import os
-from functools import reduce
+from functools import partial, reduce
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple, TypeVar
+
+try:
+    import numpy as np
+except ImportError:  # the item mask engine needs numpy, the set based solution does not
+    np = None
+
+T = TypeVar("T")
 
 
 def find_common_character(*strs) -> str:
@@ -30,27 +39,111 @@ def find_character_priority(c: str) -> int:
     return value
 
 
-def chunker(iterable, chunk_size):
-    n = len(iterable)
-    return [iterable[i : i + group_size] for i in range(0, n, chunk_size)]
+def chunker(iterable: Iterable[T], chunk_size: int) -> Iterator[Tuple[T, ...]]:
+    """Lazily groups `iterable` into tuples of `chunk_size` items, the last one may be shorter."""
+    it = iter(iterable)
+    return iter(lambda: tuple(islice(it, chunk_size)), ())
+
+
+# priority of every item, indexed by its byte value. 0 means the byte is not an item.
+_PRIORITY_BY_BYTE = bytes(
+    find_character_priority(chr(b)) if chr(b).isascii() and chr(b).isalpha() else 0
+    for b in range(256)
+)
+
+
+def item_masks(text: str, starts: "np.ndarray") -> "np.ndarray":
+    """
+    Encodes the items of `text` between consecutive `starts` offsets as 52 bit masks, where bit
+    `priority - 1` is set when the item with that priority is present. Segments must not be empty.
+    """
+    data = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    priorities = np.frombuffer(_PRIORITY_BY_BYTE, dtype=np.uint8)[data]
+    assert priorities.all(), "rucksacks may only contain letters"
+
+    item_bits = np.left_shift(np.uint64(1), (priorities - 1).astype(np.uint64))
+    return np.bitwise_or.reduceat(item_bits, starts)
+
+
+def common_item_priorities(masks: "np.ndarray") -> "np.ndarray":
+    """
+    Intersects the item masks along the last axis and returns the priority of the one common item of
+    each group, which is the bit length of the intersection.
+    """
+    common_masks = np.bitwise_and.reduce(masks, axis=-1)
+    assert not (common_masks & (common_masks - np.uint64(1))).any()
+    assert common_masks.all(), "every group needs a common item"
+
+    # frexp gives the exponent e such that 2 ** (p - 1) == 0.5 * 2 ** e, so e == p
+    _, priorities = np.frexp(common_masks.astype(np.float64))
+    return priorities
+
+
+def encode_rucksack_masks(
+    lines: List[str], group_size: int
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Returns the item masks of both halves of every rucksack, shaped (n, 2), and the item masks of every
+    rucksack grouped `group_size` at a time, shaped (n / group_size, group_size).
+    """
+    assert len(lines) % group_size == 0
+
+    lengths = np.fromiter(map(len, lines), dtype=np.int64, count=len(lines))
+    assert lengths.all() and not (lengths % 2).any()
+
+    # the halves of all lines joined together are just the lines joined together
+    line_starts = np.cumsum(lengths) - lengths
+    half_starts = np.stack([line_starts, line_starts + lengths // 2], axis=1).ravel()
+    half_masks = item_masks("".join(lines), half_starts).reshape(-1, 2)
+
+    line_masks = np.bitwise_or.reduce(half_masks, axis=1)
+    return half_masks, line_masks.reshape(-1, group_size)
+
+
+def sum_priorities_with_masks(lines: List[str], group_size: int) -> Tuple[int, int]:
+    """Solves both parts with item masks: halves of each line for part 1, groups of lines for part 2."""
+    half_masks, group_masks = encode_rucksack_masks(lines, group_size)
+    return (
+        int(common_item_priorities(half_masks).sum()),
+        int(common_item_priorities(group_masks).sum()),
+    )
+
+
+def _sum_batch_priorities(batch: Tuple[str, ...], group_size: int) -> Tuple[int, int]:
+    assert (
+        len(batch) % group_size == 0
+    ), f"number of rucksacks is not divisible by the group size {group_size}"
+
+    if np is not None:
+        return sum_priorities_with_masks(list(batch), group_size)
 
+    common_characters = map(find_common_character_in_both_halves, batch)
+    badges = (find_common_character(*group) for group in chunker(batch, group_size))
+    return (
+        sum(map(find_character_priority, common_characters)),
+        sum(map(find_character_priority, badges)),
+    )
 
-with open(os.path.join(os.path.dirname(__file__), "input.txt"), "r") as f:
-    text = f.read()
 
-lines = text.split("\n")
+def sum_priorities_streaming(
+    lines: Iterable[str], group_size: int, groups_per_batch: int = 4096
+) -> Tuple[int, int]:
+    """
+    Solves both parts in a single pass over `lines`, which can be an open file. Rucksacks are read
+    lazily and scored `groups_per_batch` groups at a time, so memory does not grow with the input.
+    """
+    rucksacks = (line.rstrip("\n") for line in lines)
+    batches = chunker(rucksacks, group_size * groups_per_batch)
+    batch_sums = map(partial(_sum_batch_priorities, group_size=group_size), batches)
+    return reduce(lambda x, y: (x[0] + y[0], x[1] + y[1]), batch_sums, (0, 0))
 
-# part 1
-common_characters = map(find_common_character_in_both_halves, lines)
-priorities = map(find_character_priority, common_characters)
-result1 = sum(priorities)
-print(result1)
 
-# part 2
-group_size = 3
-assert len(lines) % group_size == 0
-n = len(lines)
-groups = chunker(lines, group_size)
-common_characters = [find_common_character(*group) for group in groups]
-result2 = sum(map(find_character_priority, common_characters))
-print(result2)
+if __name__ == "__main__":
+    with open(os.path.join(os.path.dirname(__file__), "input.txt"), "r") as f:
+        result1, result2 = sum_priorities_streaming(f, group_size=3)
+
+    # part 1
+    print(result1)
+
+    # part 2
+    print(result2)
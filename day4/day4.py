@@ -1,6 +1,18 @@
 import os
+import sys
+from bisect import bisect_right
+from collections import Counter
 from dataclasses import dataclass
-from typing import Tuple
+from itertools import accumulate
+from typing import Iterable, List, Self, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # the columnar store needs numpy, the dataclasses do not
+    np = None
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from puzzle_input import Buffer, extract_ints, input_path, map_input  # noqa: E402
 
 
 @dataclass
@@ -39,18 +51,162 @@ def parse_assignment(line: str) -> Tuple[ElfAssignment, ElfAssignment]:
     )
 
 
-with open(os.path.join(os.path.dirname(__file__), "input.txt"), "r") as f:
-    text = f.read()
+def parse_assignments(data: Buffer) -> List[Tuple[ElfAssignment, ElfAssignment]]:
+    """Parses every pair in bulk from the numbers in the input instead of splitting each line."""
+    values = extract_ints(data)
+    assert len(values) % 4 == 0, "every line needs two assignments"
+
+    values_iter = iter(values)
+    pairs = [
+        (ElfAssignment(start1, end1), ElfAssignment(start2, end2))
+        for start1, end1, start2, end2 in zip(*[values_iter] * 4)
+    ]
+    assert all(a1.start <= a1.end and a2.start <= a2.end for a1, a2 in pairs)
+
+    return pairs
+
+
+def _build_max_end_levels(level: List[int]) -> List[List[int]]:
+    """Builds a max segment tree bottom up, returning its levels from the leaves to the root."""
+    if len(level) <= 1:
+        return [level]
+
+    parents = [max(level[i : i + 2]) for i in range(0, len(level), 2)]
+    return [level] + _build_max_end_levels(parents)
+
+
+@dataclass(frozen=True)
+class AssignmentIndex:
+    """
+    Index over many assignments for queries across all of them instead of within one pair. The
+    assignments are sorted by start and a max segment tree over their ends lets overlap queries skip
+    whole blocks of assignments that end too early.
+    """
+
+    assignments: List[ElfAssignment]
+    starts: List[int]
+    sorted_ends: List[int]
+    max_end_levels: List[List[int]]
+
+    @classmethod
+    def from_assignments(cls, assignments: Iterable[ElfAssignment]) -> Self:
+        by_start = sorted(assignments, key=lambda a: (a.start, -a.end))
+        return cls(
+            by_start,
+            [a.start for a in by_start],
+            sorted(a.end for a in by_start),
+            _build_max_end_levels([a.end for a in by_start]),
+        )
+
+    def overlapping(self, query: ElfAssignment) -> List[ElfAssignment]:
+        """Returns every assignment that overlaps the query range, in O((log n) * (k + 1))."""
+        # only assignments that start at or before the end of the query can overlap it
+        n_candidates = bisect_right(self.starts, query.end)
+        top = len(self.max_end_levels) - 1
+
+        def _collect(level: int, i: int) -> List[int]:
+            block_size = 1 << level
+            if i * block_size >= n_candidates:
+                return []
+            if self.max_end_levels[level][i] < query.start:
+                return []
+            if level == 0:
+                return [i]
+
+            return _collect(level - 1, 2 * i) + _collect(level - 1, 2 * i + 1)
+
+        if not self.assignments:
+            return []
+
+        return [self.assignments[i] for i in _collect(top, 0)]
+
+    def count_overlapping_pairs(self) -> int:
+        """Counts the pairs of assignments that overlap each other, in O(n log n)."""
+        n = len(self.assignments)
+
+        # two assignments do not overlap iff exactly one of them ends before the other starts
+        disjoint_pairs = sum(
+            n - bisect_right(self.starts, end) for end in self.sorted_ends
+        )
+        return n * (n - 1) // 2 - disjoint_pairs
+
+    def containing_others(self) -> List[ElfAssignment]:
+        """Returns every assignment that fully contains at least one other one, in O(n log n)."""
+        # assignments are sorted by start and then by descending end, so anything that starts after
+        # an assignment and ends no later than it is found with a suffix min over the ends
+        suffix_min_ends = list(
+            accumulate(
+                (a.end for a in reversed(self.assignments)),
+                min,
+                initial=sys.maxsize,
+            )
+        )[::-1]
+        duplicates = Counter((a.start, a.end) for a in self.assignments)
+
+        return [
+            a
+            for i, a in enumerate(self.assignments)
+            if suffix_min_ends[i + 1] <= a.end or duplicates[(a.start, a.end)] > 1
+        ]
+
+
+@dataclass(frozen=True)
+class AssignmentColumns:
+    """
+    Columnar store of assignment pairs: one int32 array per field instead of two `ElfAssignment`
+    objects per line, so every pair takes 16 bytes and the checks run vectorized over all pairs.
+    """
+
+    start1: "np.ndarray"
+    end1: "np.ndarray"
+    start2: "np.ndarray"
+    end2: "np.ndarray"
+
+    @classmethod
+    def from_str(cls, text: Union[str, Buffer]) -> Self:
+        """Parses every line in the following format in bulk: 2-4,6-8"""
+        raw = text.encode("ascii") if isinstance(text, str) else bytes(text)
+        numbers = raw.translate(bytes.maketrans(b"-,", b"  "))
+        values = np.fromstring(numbers, dtype=np.int32, sep=" ")
+        assert len(values) % 4 == 0, "every line needs two assignments"
+
+        # transposing into one contiguous block makes each column a contiguous view
+        start1, end1, start2, end2 = np.ascontiguousarray(values.reshape(-1, 4).T)
+        assert (start1 <= end1).all() and (start2 <= end2).all()
+
+        return cls(start1, end1, start2, end2)
+
+    def __len__(self) -> int:
+        return len(self.start1)
+
+    def count_containing(self) -> int:
+        """Counts the pairs where one assignment contains the other."""
+        first_contains_second = (self.start2 >= self.start1) & (self.end2 <= self.end1)
+        second_contains_first = (self.start1 >= self.start2) & (self.end1 <= self.end2)
+        return int(np.count_nonzero(first_contains_second | second_contains_first))
+
+    def count_overlapping(self) -> int:
+        """Counts the pairs where the assignments overlap."""
+        overlaps = (self.start1 <= self.end2) & (self.start2 <= self.end1)
+        return int(np.count_nonzero(overlaps))
+
+
+if __name__ == "__main__":
+    with map_input(input_path(__file__)) as data:
+        if np is not None:
+            columns = AssignmentColumns.from_str(data)
+        else:
+            assignments = parse_assignments(data)
 
-lines = text.split("\n")
+    if np is not None:
+        result1 = columns.count_containing()
+        result2 = columns.count_overlapping()
+    else:
+        result1 = sum(a1.contains(a2) or a2.contains(a1) for a1, a2 in assignments)
+        result2 = sum(a1.overlaps(a2) for a1, a2 in assignments)
 
-# part 1
-assignments = [parse_assignment(line) for line in lines]
-pairs_with_containment = [a1.contains(a2) or a2.contains(a1) for a1, a2 in assignments]
-result1 = sum(pairs_with_containment)
-print(result1)
+    # part 1
+    print(result1)
 
-# part 2
-pairs_that_overlap = [a1.overlaps(a2) for a1, a2 in assignments]
-result2 = sum(pairs_that_overlap)
-print(result2)
+    # part 2
+    print(result2)
@@ -0,0 +1,53 @@
+import random
+from collections import Counter
+from itertools import combinations
+from typing import List
+
+import pytest
+
+from day4 import AssignmentIndex, ElfAssignment, parse_assignment, parse_assignments
+
+
+def _random_assignments(rng: random.Random, n: int) -> List[ElfAssignment]:
+    # a narrow range of sections makes for duplicates and shared starts and ends
+    return [
+        ElfAssignment(start, rng.randint(start, 30))
+        for start in (rng.randint(1, 30) for _ in range(n))
+    ]
+
+
+def _key(assignments: List[ElfAssignment]) -> Counter:
+    return Counter((a.start, a.end) for a in assignments)
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 7, 60])
+def test_index_matches_brute_force(n):
+    rng = random.Random(n)
+    assignments = _random_assignments(rng, n)
+    index = AssignmentIndex.from_assignments(assignments)
+
+    assert index.count_overlapping_pairs() == sum(
+        a.overlaps(b) for a, b in combinations(assignments, 2)
+    )
+    assert _key(index.containing_others()) == _key(
+        [
+            a
+            for i, a in enumerate(assignments)
+            if any(a.contains(b) for j, b in enumerate(assignments) if i != j)
+        ]
+    )
+    queries = _random_assignments(rng, 20) + [ElfAssignment(0, 0)]
+    assert all(
+        _key(index.overlapping(query))
+        == _key([a for a in assignments if a.overlaps(query)])
+        for query in queries
+    )
+
+
+def test_parse_assignments_matches_parsing_each_line():
+    lines = ["2-4,6-8", "2-3,4-5", "5-7,7-9", "2-8,3-7", "6-6,4-6", "2-6,4-8"]
+    pairs = parse_assignments("\n".join(lines).encode())
+
+    assert pairs == list(map(parse_assignment, lines))
+    assert sum(a.contains(b) or b.contains(a) for a, b in pairs) == 2
+    assert sum(a.overlaps(b) for a, b in pairs) == 4
@@ -1,8 +1,13 @@
 import os
 import re
+import sys
 from dataclasses import dataclass
 from functools import partial, reduce
-from typing import List, Optional, Self
+from itertools import accumulate, islice, takewhile
+from typing import Iterable, List, Optional, Self, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from puzzle_input import Buffer, extract_ints, input_path, map_input  # noqa: E402
 
 
 @dataclass
@@ -25,38 +30,25 @@ class MoveCommand:
 
 
 def parse_stacks_initial_state(stacks_lines: List[str]) -> List[List[str]]:
-    """Parses lines that represent the various stacks in their initial state."""
+    """
+    Parses lines that represent the various stacks in their initial state. The diagram is fixed width,
+    so once every line is padded to the same width and they are joined together, the crates of a stack
+    are every `width`th character of the result. Each stack is then built from one slice instead of
+    one layer at a time.
+    """
+    # how many characters each "crate" in the line takes up in the input file
+    crate_width = 4
+    width = max(map(len, stacks_lines))
+    n_stacks = (width + 1) // crate_width
 
-    def _parse_crate_str(crate_str: str) -> Optional[str]:
-        """parses a crate of the from '[Q] ' to 'Q'"""
-        n = len(crate_str.strip())
-        if not n:
-            # this means there was nothing on the stack
-            return None
+    diagram = "".join(line.ljust(width) for line in stacks_lines)
+    columns = [diagram[i * crate_width + 1 :: width] for i in range(n_stacks)]
 
-        assert len(crate_str.strip()) == 3
-        return crate_str.strip()[1]
+    # read upwards, a column holds the crates of the stack followed by the empty space above it
+    stacks = [column[::-1].rstrip(" ") for column in columns]
+    assert all(" " not in stack for stack in stacks), "crates can not float in the air"
 
-    def _parse_crate_stack_line(line: str) -> List[Optional[str]]:
-        # how many characters each "crate" in the line takes up in the input file
-        crate_width = 4
-        return [
-            _parse_crate_str(line[i : i + crate_width])
-            for i in range(0, len(line), crate_width)
-        ]
-
-    def _add_layer_to_state(
-        stack_state: List[List[str]], layer: List[Optional[str]]
-    ) -> List[List[str]]:
-        return [
-            stack_state[i] + ([crate] if crate is not None else [])
-            for i, crate in enumerate(layer)
-        ]
-
-    layers = [_parse_crate_stack_line(line) for line in reversed(stacks_lines)]
-    empty_stack_state = [[] for _ in range(len(layers[0]))]
-
-    return reduce(_add_layer_to_state, layers, empty_stack_state)
+    return [list(stack) for stack in stacks]
 
 
 def apply_move_to_stacks(
@@ -88,24 +80,230 @@ def apply_move_to_stacks(
     return result
 
 
-with open(os.path.join(os.path.dirname(__file__), "input.txt"), "r") as f:
-    text = f.read()
+# a cons cell holding a crate and the rest of the stack below it, None is the empty stack
+_Cell = Optional[Tuple[str, "_Cell"]]
+
+
+@dataclass(frozen=True)
+class CrateStack:
+    """
+    Persistent stack of crates built from cons cells. Pushing and popping create new cells on top of
+    the existing ones instead of copying them, so every older version of a stack stays valid and a move
+    only costs as much as the number of crates it moves.
+    """
+
+    top: _Cell
+    size: int
+
+    @classmethod
+    def from_list(cls, crates: List[str]) -> Self:
+        """Builds a stack from a list of crates ordered from the bottom to the top."""
+        return reduce(cls.push, crates, cls(None, 0))
+
+    def push(self, crate: str) -> Self:
+        return CrateStack((crate, self.top), self.size + 1)
+
+    def push_all(self, crates: Iterable[str]) -> Self:
+        """Pushes the crates in order, so the last one ends up on top."""
+        return reduce(CrateStack.push, crates, self)
+
+    def pop_n(self, n: int) -> Tuple[List[str], Self]:
+        """Returns the top `n` crates, topmost first, and the stack below them."""
+        assert self.size >= n, f"Can not pop {n} from a stack of {self.size} crates"
+        if n == 0:
+            # `accumulate` treats an `initial` of None as no initial value, so an empty stack can not
+            # go through it
+            return [], self
+
+        # walks down n cells: the cell we start at and the n cells below it
+        cells = list(accumulate(range(n), lambda cell, _: cell[1], initial=self.top))
+        return [cell[0] for cell in cells[:-1]], CrateStack(cells[-1], self.size - n)
+
+    def peek(self) -> str:
+        assert self.top is not None, "the stack is empty"
+        return self.top[0]
+
+    def to_list(self) -> List[str]:
+        """Returns the crates ordered from the bottom to the top."""
+        return self.pop_n(self.size)[0][::-1]
+
+
+def apply_move_to_crate_stacks(
+    stacks: Tuple[CrateStack, ...], command: MoveCommand, is_9001: bool = False
+) -> Tuple[CrateStack, ...]:
+    """
+    Same as `apply_move_to_stacks` for persistent stacks. The stacks that are not part of the move are
+    shared with the previous state, so it stays valid and the move costs O(amount).
+    """
+    from_i, to_i = command.from_stack - 1, command.to_stack - 1
+    to_add, start_stack = stacks[from_i].pop_n(command.amount)
+
+    # crates come off the start stack topmost first, the 9000 moves them one at a time in that order
+    # while the 9001 keeps their order by moving them all at once
+    end_stack = stacks[to_i].push_all(to_add[::-1] if is_9001 else to_add)
+
+    return tuple(
+        start_stack if i == from_i else end_stack if i == to_i else stack
+        for i, stack in enumerate(stacks)
+    )
+
+
+@dataclass(frozen=True)
+class MoveHistory:
+    """
+    Answers "what do the stacks look like after move k" without replaying every move from the start.
+    The state after every `checkpoint_interval` moves is kept, so a query replays at most that many
+    moves. Checkpoints share their crates through `CrateStack`, so a smaller interval costs memory
+    only for the crates that moved in between.
+    """
+
+    checkpoints: List[Tuple[CrateStack, ...]]
+    move_commands: List[MoveCommand]
+    checkpoint_interval: int
+    is_9001: bool
+
+    @classmethod
+    def build(
+        cls,
+        initial_stacks_state: List[List[str]],
+        move_commands: List[MoveCommand],
+        checkpoint_interval: int,
+        is_9001: bool = False,
+    ) -> Self:
+        assert checkpoint_interval >= 1
+
+        apply_move = partial(apply_move_to_crate_stacks, is_9001=is_9001)
+        initial_crate_stacks = tuple(map(CrateStack.from_list, initial_stacks_state))
+        states = accumulate(move_commands, apply_move, initial=initial_crate_stacks)
+
+        return cls(
+            list(islice(states, 0, None, checkpoint_interval)),
+            move_commands,
+            checkpoint_interval,
+            is_9001,
+        )
+
+    def stacks_after(self, k: int) -> Tuple[CrateStack, ...]:
+        """Returns the stacks after the first `k` moves, 0 being the initial state."""
+        assert 0 <= k <= len(self.move_commands), f"there is no move {k}"
+
+        checkpoint_i = k // self.checkpoint_interval
+        replay_start = checkpoint_i * self.checkpoint_interval
+        return reduce(
+            partial(apply_move_to_crate_stacks, is_9001=self.is_9001),
+            self.move_commands[replay_start:k],
+            self.checkpoints[checkpoint_i],
+        )
+
+    def top_crates_after(self, k: int) -> str:
+        """Returns the top crates after the first `k` moves, with a space for empty stacks."""
+        return "".join(
+            [stack.peek() if stack.size else " " for stack in self.stacks_after(k)]
+        )
+
+
+def _trace_position_before_move(
+    position: Tuple[int, int], command: MoveCommand, is_9001: bool
+) -> Tuple[int, int]:
+    """
+    Given a (stack index, depth from the top) position after `command`, returns where the crate in it
+    was before the command.
+    """
+    stack_i, depth = position
+    from_i, to_i = command.from_stack - 1, command.to_stack - 1
+
+    if stack_i == to_i:
+        if depth >= command.amount:
+            return stack_i, depth - command.amount
+
+        # the 9000 moved the crates one at a time, which reversed them
+        return from_i, depth if is_9001 else command.amount - 1 - depth
+
+    if stack_i == from_i:
+        return stack_i, depth + command.amount
+
+    return position
+
+
+def trace_top_crates(
+    initial_stacks_state: List[List[str]],
+    move_commands: List[MoveCommand],
+    is_9001: bool = False,
+) -> str:
+    """
+    Finds the top crates after all moves without moving any crates. Starting from the top of every
+    stack, the moves are walked backwards to find where each top crate was in the initial state, which
+    costs O(moves * stacks) no matter how tall the stacks are or how many crates move.
+    Empty stacks are shown as a space.
+    """
+
+    def _trace_before(
+        positions: List[Tuple[int, int]], command: MoveCommand
+    ) -> List[Tuple[int, int]]:
+        return [
+            _trace_position_before_move(position, command, is_9001)
+            for position in positions
+        ]
+
+    final_top_positions = [(i, 0) for i in range(len(initial_stacks_state))]
+    initial_positions = reduce(
+        _trace_before, reversed(move_commands), final_top_positions
+    )
+
+    # a position deeper than the initial stack means the stack ends up empty
+    return "".join(
+        [
+            (
+                initial_stacks_state[i][-1 - depth]
+                if depth < len(initial_stacks_state[i])
+                else " "
+            )
+            for i, depth in initial_positions
+        ]
+    )
+
+
+def parse_input(data: Buffer) -> Tuple[List[List[str]], List[MoveCommand]]:
+    """
+    Parses the initial stacks and the move commands out of the puzzle input. Only the diagram is split
+    into lines, the move commands are read in bulk from the numbers that follow it.
+    """
+    view = memoryview(data)
+    # crates are single upper case letters, so the first "move" is where the moves start
+    first_move = re.search(rb"move", data)
+    moves_start = first_move.start() if first_move is not None else len(view)
+
+    diagram_lines = bytes(view[:moves_start]).decode("ascii").split("\n")
+    # every line above the stack labels is a layer of crates, even when it starts with a gap
+    crate_lines = list(
+        takewhile(lambda line: not line.lstrip()[:1].isdigit(), diagram_lines)
+    )
+    assert len(crate_lines) < len(diagram_lines), "the diagram has no stack labels"
+    # the labels span every stack, so padding the layers to them keeps stacks with no crates
+    labels_width = len(diagram_lines[len(crate_lines)].rstrip()) + 1
+    initial_stacks_state = parse_stacks_initial_state(
+        [line.ljust(labels_width) for line in crate_lines]
+    )
+
+    values = extract_ints(view[moves_start:])
+    assert len(values) % 3 == 0, "every move needs an amount, a from and a to stack"
+    values_iter = iter(values)
+    move_commands = [
+        MoveCommand(amount, from_stack, to_stack)
+        for amount, from_stack, to_stack in zip(*[values_iter] * 3)
+    ]
 
-lines = text.split("\n")
+    return initial_stacks_state, move_commands
 
-init_lines = [line for line in lines if line.startswith("[")]
-initial_stacks_state = parse_stacks_initial_state(init_lines)
 
-move_lines = [line for line in lines if line.startswith("move")]
-move_commands = [MoveCommand.from_str(line) for line in move_lines]
+if __name__ == "__main__":
+    with map_input(input_path(__file__)) as data:
+        initial_stacks_state, move_commands = parse_input(data)
 
-# part 1
-final_stacks_state = reduce(apply_move_to_stacks, move_commands, initial_stacks_state)
-result1 = "".join([stack[-1] for stack in final_stacks_state])
-print(result1)
+    # part 1
+    result1 = trace_top_crates(initial_stacks_state, move_commands)
+    print(result1)
 
-# part 2
-apply_move_with_9001 = partial(apply_move_to_stacks, is_9001=True)
-final_stacks_state = reduce(apply_move_with_9001, move_commands, initial_stacks_state)
-result2 = "".join([stack[-1] for stack in final_stacks_state])
-print(result2)
+    # part 2
+    result2 = trace_top_crates(initial_stacks_state, move_commands, is_9001=True)
+    print(result2)
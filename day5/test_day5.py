@@ -0,0 +1,103 @@
+import random
+from functools import partial, reduce
+from itertools import accumulate, islice
+from typing import List, Tuple
+
+import pytest
+
+from day5 import (
+    CrateStack,
+    MoveCommand,
+    MoveHistory,
+    apply_move_to_crate_stacks,
+    apply_move_to_stacks,
+    parse_input,
+    trace_top_crates,
+)
+
+
+def _random_moves(
+    rng: random.Random, stacks: List[List[str]], n_moves: int
+) -> List[MoveCommand]:
+    """Valid moves for the stacks, about half of which move every crate of a stack."""
+
+    def _next_move(state: Tuple[Tuple[int, ...], MoveCommand], _):
+        heights, _ = state
+        from_i = rng.choice([i for i, h in enumerate(heights) if h])
+        to_i = rng.choice([i for i in range(len(heights)) if i != from_i])
+        amount = rng.choice([heights[from_i], rng.randint(1, heights[from_i])])
+
+        new_heights = tuple(
+            h - amount if i == from_i else h + amount if i == to_i else h
+            for i, h in enumerate(heights)
+        )
+        return new_heights, MoveCommand(amount, from_i + 1, to_i + 1)
+
+    states = accumulate(
+        range(n_moves), _next_move, initial=(tuple(map(len, stacks)), None)
+    )
+    return [move for _, move in islice(states, 1, None)]
+
+
+def test_crate_stack_round_trips_through_empty():
+    assert CrateStack.from_list([]).to_list() == []
+    assert CrateStack.from_list([]).pop_n(0) == ([], CrateStack(None, 0))
+
+    crates, rest = CrateStack.from_list(["A", "B"]).pop_n(2)
+    assert crates == ["B", "A"]
+    assert rest.to_list() == []
+    assert rest.push("C").to_list() == ["C"]
+
+
+def test_move_that_empties_a_stack():
+    stacks = (CrateStack.from_list(["A", "B"]), CrateStack.from_list(["C"]))
+    after = apply_move_to_crate_stacks(stacks, MoveCommand(2, 1, 2))
+
+    assert [stack.to_list() for stack in after] == [[], ["C", "B", "A"]]
+    # the stacks before the move are untouched
+    assert [stack.to_list() for stack in stacks] == [["A", "B"], ["C"]]
+
+
+@pytest.mark.parametrize("is_9001", [False, True])
+@pytest.mark.parametrize("checkpoint_interval", [1, 3, 50])
+def test_move_history_matches_replaying_the_moves(is_9001, checkpoint_interval):
+    rng = random.Random(checkpoint_interval)
+    stacks = [list("AB"), list("C"), list("DEF"), []]
+    moves = _random_moves(rng, stacks, 40)
+    history = MoveHistory.build(stacks, moves, checkpoint_interval, is_9001)
+
+    apply_move = partial(apply_move_to_stacks, is_9001=is_9001)
+    for k in range(len(moves) + 1):
+        expected = reduce(apply_move, moves[:k], stacks)
+        assert [s.to_list() for s in history.stacks_after(k)] == expected
+        assert history.top_crates_after(k) == "".join(
+            stack[-1] if stack else " " for stack in expected
+        )
+
+
+SAMPLE = b"""    [D]    
+[N] [C]    
+[Z] [M] [P]
+ 1   2   3 
+
+move 1 from 2 to 1
+move 3 from 1 to 3
+move 2 from 2 to 1
+move 1 from 1 to 2"""
+
+
+def test_parse_input_keeps_layers_that_start_with_a_gap():
+    stacks, moves = parse_input(SAMPLE)
+
+    assert stacks == [["Z", "N"], ["M", "C", "D"], ["P"]]
+    assert moves[0] == MoveCommand(1, 2, 1)
+    assert trace_top_crates(stacks, moves) == "CMZ"
+    assert trace_top_crates(stacks, moves, is_9001=True) == "MCD"
+
+
+def test_parse_input_with_trimmed_rows_and_an_empty_stack():
+    diagram = b"        [A]\n    [B] [C]\n 1   2   3   4\n\nmove 1 from 3 to 4"
+    stacks, moves = parse_input(diagram)
+
+    assert stacks == [[], ["B"], ["C", "A"], []]
+    assert trace_top_crates(stacks, moves) == " BCA"
@@ -1,7 +1,31 @@
+import asyncio
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
-from itertools import accumulate
-from typing import Dict, Iterator, Self
+from functools import partial
+from itertools import accumulate, chain
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Self,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+try:
+    import numpy as np
+except ImportError:  # only the batched marker search needs numpy
+    np = None
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from puzzle_input import Buffer, input_path, map_input  # noqa: E402
 
 
 @dataclass
@@ -46,12 +70,270 @@ def find_first_index_after_distinct_char_marker(
     )
 
 
-with open(os.path.join(os.path.dirname(__file__), "input.txt"), "r") as f:
-    text = f.read()
+class MarkerDetector:
+    """
+    Finds the first marker of every requested length in a single pass over a datastream that can
+    arrive in chunks. Instead of rebuilding a window per character, it keeps the position each byte
+    was last seen at, so every byte costs O(1) no matter how long the markers are.
+
+    Unlike the rest of this file the detector is mutable and `feed` loops over the bytes: an immutable
+    last seen table would have to be copied for every byte, and the state has to outlive each chunk.
+    """
+
+    def __init__(self, marker_lengths: Iterable[int]):
+        self.pending_lengths = sorted(set(marker_lengths))
+        assert self.pending_lengths and self.pending_lengths[0] >= 1
+        self.markers: Dict[int, int] = {}
+        self.last_seen = [-1] * 256
+        # start of the longest run of distinct bytes that ends at the last byte fed in
+        self.window_start = 0
+        self.n_bytes_seen = 0
+
+    @property
+    def done(self) -> bool:
+        return not self.pending_lengths
+
+    def feed(self, chunk: Buffer) -> Dict[int, int]:
+        """
+        Scans the next chunk of the stream, picking up where the previous chunk ended. Returns the
+        markers that were completed in this chunk as {marker length: index right after the marker}.
+        """
+        found = {}
+        last_seen = self.last_seen
+        window_start = self.window_start
+        # only the shortest pending marker can be the next one to complete
+        next_length = self.pending_lengths[0] if self.pending_lengths else 0
+
+        # iterating a memoryview gives ints for every kind of buffer, an mmap would give 1 byte strings
+        with memoryview(chunk) as view:
+            for i, b in enumerate(view, self.n_bytes_seen):
+                if last_seen[b] >= window_start:
+                    window_start = last_seen[b] + 1
+                last_seen[b] = i
+
+                while next_length and i - window_start + 1 >= next_length:
+                    found[next_length] = i + 1
+                    self.pending_lengths.pop(0)
+                    next_length = self.pending_lengths[0] if self.pending_lengths else 0
+
+                if not next_length:
+                    break
+
+        self.window_start = window_start
+        self.n_bytes_seen += len(chunk)
+        self.markers.update(found)
+        return found
+
+
+def find_markers(data: Buffer, marker_lengths: Iterable[int]) -> Dict[int, int]:
+    """
+    Returns {marker length: index right after the first marker of that length} for every length that
+    has a marker in `data`, from a single O(n) scan.
+    """
+    detector = MarkerDetector(marker_lengths)
+    detector.feed(data)
+    return detector.markers
+
+
+ByteStream = Union[asyncio.StreamReader, AsyncIterable[bytes]]
+
+
+async def _iter_chunks(stream: ByteStream, chunk_size: int) -> AsyncIterator[bytes]:
+    if isinstance(stream, asyncio.StreamReader):
+        chunk = await stream.read(chunk_size)
+        while chunk:
+            yield chunk
+            chunk = await stream.read(chunk_size)
+    else:
+        async for chunk in stream:
+            yield chunk
+
+
+async def iter_markers_in_stream(
+    stream: ByteStream, marker_lengths: Iterable[int], chunk_size: int = 1 << 16
+) -> AsyncIterator[Tuple[int, int]]:
+    """
+    Yields (marker length, index right after the marker) as soon as the chunk that completes a marker
+    arrives. Only one chunk of the stream is held in memory at a time, and reading stops once every
+    marker was found.
+    """
+    detector = MarkerDetector(marker_lengths)
+    chunks = _iter_chunks(stream, chunk_size)
+    try:
+        async for chunk in chunks:
+            for found in sorted(detector.feed(chunk).items()):
+                yield found
+            if detector.done:
+                return
+    finally:
+        await chunks.aclose()
+
+
+async def find_markers_in_stream(
+    stream: ByteStream, marker_lengths: Iterable[int], chunk_size: int = 1 << 16
+) -> Dict[int, int]:
+    """Same as `find_markers`, for a stream that is read chunk by chunk."""
+    return dict(
+        [
+            found
+            async for found in iter_markers_in_stream(
+                stream, marker_lengths, chunk_size
+            )
+        ]
+    )
+
+
+async def find_markers_in_streams(
+    streams: Iterable[ByteStream],
+    marker_lengths: Iterable[int],
+    chunk_size: int = 1 << 16,
+) -> List[Dict[int, int]]:
+    """Scans all streams concurrently in the running event loop, in the order they were given."""
+    marker_lengths = list(marker_lengths)
+    return await asyncio.gather(
+        *(
+            find_markers_in_stream(stream, marker_lengths, chunk_size)
+            for stream in streams
+        )
+    )
+
+
+def _popcount(words: "np.ndarray") -> "np.ndarray":
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    # numpy < 2 has no popcount ufunc, so count the bits of every byte with a table
+    all_bytes = np.arange(256, dtype=np.uint8)[:, None]
+    bits_per_byte = np.unpackbits(all_bytes, axis=1).sum(axis=1)
+    byte_counts = bits_per_byte[words.view(np.uint8)]
+    return byte_counts.reshape(*words.shape, words.itemsize).sum(-1)
+
+
+# every distinct byte of a batch gets one bit of a uint64 mask
+MAX_BATCH_DISTINCT_BYTES = 64
+
+
+def _count_distinct_bytes(streams: Sequence[bytes]) -> int:
+    data = np.frombuffer(b"".join(streams), dtype=np.uint8)
+    return int(np.count_nonzero(np.bincount(data, minlength=256)))
+
+
+def find_markers_in_batch(
+    streams: Sequence[bytes], marker_lengths: Iterable[int]
+) -> Dict[int, "np.ndarray"]:
+    """
+    Vectorized `find_markers` for many short streams at once. The streams are padded into one array
+    where every byte is replaced by a one-hot bitmask, and a window is a marker when the OR of its
+    masks has as many bits set as the window is long. Returns {marker length: index right after the
+    first marker of every stream}, with -1 for streams that have no marker of that length.
+    """
+    assert np is not None, "the batched marker search needs numpy"
+    marker_lengths = sorted(set(marker_lengths))
+    lengths = np.fromiter(map(len, streams), dtype=np.int64, count=len(streams))
+    width = max(int(lengths.max(initial=0)), marker_lengths[-1])
+    in_stream = np.arange(width) < lengths[:, None]
+
+    data = np.frombuffer(b"".join(streams), dtype=np.uint8)
+    is_used = np.zeros(256, dtype=bool)
+    is_used[data] = True
+    assert (
+        is_used.sum() <= MAX_BATCH_DISTINCT_BYTES
+    ), f"a batch can use at most {MAX_BATCH_DISTINCT_BYTES} distinct bytes"
+    bit_by_byte = np.left_shift(
+        np.uint64(1), (np.cumsum(is_used) - 1).clip(0).astype(np.uint64)
+    )
+    # the padding after the end of a stream stays 0 and is never part of a valid window
+    masks = np.zeros((len(streams), width), dtype=np.uint64)
+    masks[in_stream] = bit_by_byte[data]
+
+    def _double_span(spans: "np.ndarray", _) -> "np.ndarray":
+        """Turns the ORs of every span of n masks into the ORs of every span of 2n masks."""
+        span_length = width - spans.shape[1] + 1
+        return spans[:, :-span_length] | spans[:, span_length:]
+
+    # OR is idempotent, so the OR of a window is the OR of the two (overlapping) power of two spans
+    # that start and end it, which takes log(marker length) passes instead of one per mask
+    n_doublings = marker_lengths[-1].bit_length() - 1
+    spans_by_doublings = list(
+        accumulate(range(n_doublings), _double_span, initial=masks)
+    )
+
+    def _first_marker_ends(marker_length: int) -> "np.ndarray":
+        doublings = marker_length.bit_length() - 1
+        spans = spans_by_doublings[doublings]
+        n_windows = width - marker_length + 1
+        offset = marker_length - (1 << doublings)
+        window_masks = spans[:, :n_windows] | spans[:, offset : offset + n_windows]
+        is_marker = (_popcount(window_masks) == marker_length) & in_stream[
+            :, marker_length - 1 :
+        ]
+        return np.where(
+            is_marker.any(axis=1), is_marker.argmax(axis=1) + marker_length, -1
+        )
+
+    return {
+        marker_length: _first_marker_ends(marker_length)
+        for marker_length in marker_lengths
+    }
+
+
+def _find_markers_in_sub_batch(
+    streams: Sequence[bytes], marker_lengths: List[int]
+) -> Dict[int, List[int]]:
+    if np is not None and _count_distinct_bytes(streams) <= MAX_BATCH_DISTINCT_BYTES:
+        return {
+            marker_length: ends.tolist()
+            for marker_length, ends in find_markers_in_batch(
+                streams, marker_lengths
+            ).items()
+        }
+
+    markers = [find_markers(stream, marker_lengths) for stream in streams]
+    return {
+        marker_length: [m.get(marker_length, -1) for m in markers]
+        for marker_length in marker_lengths
+    }
+
+
+def parallel_find_markers_in_batch(
+    streams: Sequence[bytes],
+    marker_lengths: Iterable[int],
+    batch_size: int = 4096,
+    n_workers: Optional[int] = None,
+) -> Dict[int, List[int]]:
+    """
+    Same result as `find_markers_in_batch` for batches too big for one array. The streams are split
+    into sub-batches of `batch_size` that are searched in their own processes. Sub-batches use the
+    per-stream detector when numpy is not installed or when they have more distinct bytes than fit
+    in a mask.
+    """
+    marker_lengths = sorted(set(marker_lengths))
+    sub_batches = [
+        streams[start : start + batch_size]
+        for start in range(0, len(streams), batch_size)
+    ]
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        sub_batch_markers = list(
+            executor.map(
+                partial(_find_markers_in_sub_batch, marker_lengths=marker_lengths),
+                sub_batches,
+            )
+        )
+
+    return {
+        marker_length: list(
+            chain.from_iterable(m[marker_length] for m in sub_batch_markers)
+        )
+        for marker_length in marker_lengths
+    }
+
 
+if __name__ == "__main__":
+    with map_input(input_path(__file__)) as data:
+        markers = find_markers(data, {4, 14})
 
-# part 1
-print(find_first_index_after_distinct_char_marker(iter(text), 4))
+    # part 1
+    print(markers[4])
 
-# part 2
-print(find_first_index_after_distinct_char_marker(iter(text), 14))
+    # part 2
+    print(markers[14])
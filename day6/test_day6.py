@@ -0,0 +1,89 @@
+import asyncio
+import random
+from typing import Dict, List
+
+import pytest
+
+from day6 import (
+    MarkerDetector,
+    find_markers,
+    find_markers_in_streams,
+    np,
+    parallel_find_markers_in_batch,
+)
+
+SAMPLES = {
+    "mjqjpqmgbljsphdztnvjfqwrcgsmlb": (7, 19),
+    "bvwbjplbgvbhsrlpgdmjqwftvncz": (5, 23),
+    "nppdvjthqldpwncqszvftbrmjlhg": (6, 23),
+    "nznrnfrfntjfmvfwmzdfjlvtqnbhcprsg": (10, 29),
+    "zcfzfwzzqfrljwzlrfnpqdbhtmscgvjw": (11, 26),
+}
+
+
+def _expected_markers(text: str, marker_lengths: List[int]) -> Dict[int, int]:
+    """Brute force: checks every window of every length."""
+    ends = {
+        length: [
+            i + length
+            for i in range(len(text) - length + 1)
+            if len(set(text[i : i + length])) == length
+        ]
+        for length in marker_lengths
+    }
+    return {length: found[0] for length, found in ends.items() if found}
+
+
+def _random_streams(rng: random.Random, alphabet: bytes, n: int) -> list:
+    return [
+        bytes(
+            rng.choices(alphabet[: rng.randint(1, len(alphabet))], k=rng.randint(0, 60))
+        )
+        for _ in range(n)
+    ]
+
+
+@pytest.mark.parametrize("text, expected", SAMPLES.items())
+def test_find_markers_on_samples(text, expected):
+    assert find_markers(text.encode("ascii"), {4, 14}) == dict(zip((4, 14), expected))
+
+
+def test_marker_detector_carries_state_across_chunks():
+    rng = random.Random(0)
+    texts = [s.decode("ascii") for s in _random_streams(rng, b"abcdefghij", 200)]
+
+    def _feed_in_chunks(text: str) -> dict:
+        detector = MarkerDetector([1, 3, 4, 7])
+        chunk_size = rng.randint(1, 5)
+        for i in range(0, len(text), chunk_size):
+            detector.feed(text[i : i + chunk_size].encode("ascii"))
+        return detector.markers
+
+    assert [_feed_in_chunks(text) for text in texts] == [
+        _expected_markers(text, [1, 3, 4, 7]) for text in texts
+    ]
+
+
+def test_find_markers_in_async_streams():
+    async def _chunks(data: bytes):
+        for i in range(0, len(data), 3):
+            await asyncio.sleep(0)
+            yield data[i : i + 3]
+
+    texts = [text.encode("ascii") for text in SAMPLES]
+    results = asyncio.run(find_markers_in_streams(map(_chunks, texts), [4, 14]))
+    assert results == [dict(zip((4, 14), expected)) for expected in SAMPLES.values()]
+
+
+@pytest.mark.skipif(np is None, reason="the batched search needs numpy")
+@pytest.mark.parametrize("alphabet", [b"abcdefghijklmnopqrstuvwxyz", bytes(range(200))])
+def test_parallel_batch_matches_per_stream_detector(alphabet):
+    streams = _random_streams(random.Random(1), alphabet, 300)
+    expected = [find_markers(stream, [2, 4, 14]) for stream in streams]
+
+    markers = parallel_find_markers_in_batch(
+        streams, [2, 4, 14], batch_size=64, n_workers=1
+    )
+    assert {
+        length: [m.get(length, -1) for m in expected] for length in (2, 4, 14)
+    } == markers
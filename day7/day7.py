@@ -1,8 +1,15 @@
 import os
-import enum
-from dataclasses import dataclass
-from itertools import chain
-from typing import Iterator, Iterable, List, Self
+import struct
+import sys
+from array import array
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import reduce
+from itertools import accumulate, chain, groupby, repeat, takewhile
+from typing import Dict, Iterable, Iterator, List, Optional, Self, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from puzzle_input import Buffer, input_path, iter_lines, map_input  # noqa: E402
 
 
 @dataclass
@@ -12,8 +19,17 @@ class DirectoryNode:
     children: List[Self]
 
     def get_all_dirs_under_node(self) -> Iterable[Self]:
-        yield from chain(*[child.get_all_dirs_under_node() for child in self.children])
-        yield self
+        """Returns every directory under this one, children before their parent, without recursing."""
+        # walks down one level of the tree at a time, the deepest level is listed first
+        levels = takewhile(
+            bool,
+            accumulate(
+                repeat(None),
+                lambda level, _: [child for node in level for child in node.children],
+                initial=[self],
+            ),
+        )
+        return list(chain.from_iterable(reversed(list(levels))))
 
     def get_all_dirs_under_node_with_size_less_than(
         self, size_limit: int
@@ -35,116 +51,420 @@ class DirectoryNode:
         )
 
 
-def parse_command_output(cmd_lines: List[str]) -> DirectoryNode:
-    """parses the command output and returns the root directory node in the file system."""
+ROOT_ID = 0
+
+
+@dataclass
+class FlatDirectoryTree:
+    """
+    A directory tree stored as parallel arrays indexed by directory id instead of as linked nodes.
+    Directories get their id when they are first listed or entered, so a parent always has a smaller
+    id than its children, and walking the ids backwards visits every child before its parent.
+    """
+
+    parents: array = field(default_factory=lambda: array("q", [-1]))
+    own_sizes: array = field(default_factory=lambda: array("q", [0]))
+    total_sizes: array = field(default_factory=lambda: array("q", [0]))
+    name_ids: array = field(default_factory=lambda: array("q", [0]))
+    # every distinct name is stored once, the name table maps it back to its id
+    names: List[str] = field(default_factory=lambda: ["/"])
+    name_table: Dict[str, int] = field(default_factory=lambda: {"/": 0})
+    children_by_name: Dict[Tuple[int, int], int] = field(default_factory=dict)
+    # the size of every file by (directory id, file name), so listing a directory again does not
+    # count its files twice
+    file_sizes: Dict[Tuple[int, str], int] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.parents)
 
-    class LineType(enum.Enum):
-        """The three type of lines we expect to see in the output."""
-
-        CD = 1
-        CD_UP = 2
-        LS = 3
-        LS_OUTPUT_DIR = 4
-        LS_OUTPUT_FILE = 5
-
-        @classmethod
-        def parse_from_line(cls, line: str) -> Self:
-            line_parts = line.split()
-
-            if line.startswith("$"):
-                assert len(line_parts) >= 2
-                cmd = line_parts[1]
-
-                assert cmd in ("cd", "ls")
-
-                if cmd == "cd":
-                    return LineType.CD if ".." not in line else LineType.CD_UP
-
-                return LineType.LS
-            else:
-                # we are parsing LS output
-                assert len(line_parts) == 2
-                output_start, _ = line.split()
-
-                if output_start == "dir":
-                    return LineType.LS_OUTPUT_DIR
-                elif output_start.isdigit():
-                    return LineType.LS_OUTPUT_FILE
-
-                raise ValueError(f"could not parse LS output {line=}")
-
-    def create_dir_helper(name: str, line_iter: Iterator[str]) -> DirectoryNode:
-        """Called after a LineType.CD is encountered with a directory name."""
-        assert (
-            LineType.parse_from_line(next(line_iter)) == LineType.LS
-        ), "Expect an ls after entering a directory"
-
-        child_dirs = []
-        expected_dirs = []
-        total_size = 0
-
-        for line in line_iter:
-            line_type = LineType.parse_from_line(line)
-
-            match line_type:
-                case LineType.LS_OUTPUT_DIR:
-                    _, dir_name = line.split()
-                    expected_dirs.append(dir_name)
-                case LineType.LS_OUTPUT_FILE:
-                    size, _ = line.split()
-                    total_size += int(size)
-                case LineType.CD:
-                    _, _, cd_target = line.split()
-                    child_dir = create_dir_helper(cd_target, line_iter)
-                    total_size += child_dir.total_size
-                    child_dirs.append(child_dir)
-                case LineType.CD_UP:
-                    break
+    @classmethod
+    def from_lines(cls, cmd_lines: Iterable[str]) -> Self:
+        tree, _ = cls.from_lines_with_cwd(cmd_lines)
+        return tree
+
+    @classmethod
+    def from_lines_with_cwd(cls, cmd_lines: Iterable[str]) -> Tuple[Self, int]:
+        """Also returns the directory the transcript ends in, to continue it from there later."""
+        lines_iter = iter(cmd_lines)
+        first_line = next(lines_iter)
+        assert first_line.split() == [
+            "$",
+            "cd",
+            "/",
+        ], "command lines should start with a cd command on root (/)"
+
+        tree = cls()
+        cwd, _ = tree.read_lines(lines_iter, ROOT_ID)
+        tree.compute_total_sizes()
+        return tree, cwd
+
+    def name(self, dir_id: int) -> str:
+        return self.names[self.name_ids[dir_id]]
+
+    def _intern_name(self, name: str) -> int:
+        name_id = self.name_table.setdefault(name, len(self.names))
+        if name_id == len(self.names):
+            self.names.append(sys.intern(name))
+        return name_id
+
+    def _child(self, parent: int, name: str) -> int:
+        """Returns the id of the named subdirectory, adding it the first time it is listed or entered."""
+        key = (parent, self._intern_name(name))
+        dir_id = self.children_by_name.setdefault(key, len(self.parents))
+        if dir_id == len(self.parents):
+            self.parents.append(parent)
+            self.own_sizes.append(0)
+            self.total_sizes.append(0)
+            self.name_ids.append(key[1])
+        return dir_id
+
+    def read_lines(
+        self, cmd_lines: Iterable[str], cwd: int
+    ) -> Tuple[int, Dict[int, int]]:
+        """
+        Adds the directories and files in the transcript lines to the tree, starting in `cwd`. Returns
+        the directory the transcript ends in and how much file size every directory gained, which is
+        negative for a directory whose files shrank. Total
+        sizes are not updated. The tree grows in place so a transcript can be continued later, which
+        is also why this is a loop over the lines rather than a fold that rebuilds the arrays.
+        """
+        added_sizes = {}
+        for line in cmd_lines:
+            match line.split():
+                case ["$", "cd", "/"]:
+                    cwd = ROOT_ID
+                case ["$", "cd", ".."]:
+                    assert cwd != ROOT_ID, "can not leave the root directory"
+                    cwd = self.parents[cwd]
+                case ["$", "cd", name]:
+                    cwd = self._child(cwd, name)
+                case ["dir", name]:
+                    # a directory that is listed but never entered stays in the tree, empty
+                    self._child(cwd, name)
+                case ["$", "ls"] | []:
+                    pass
+                case [size, name] if size.isdigit():
+                    # a file that was listed before only adds how much it grew or shrank since
+                    old_size = self.file_sizes.get((cwd, name), 0)
+                    self.file_sizes[cwd, name] = int(size)
+                    if int(size) != old_size:
+                        self.own_sizes[cwd] += int(size) - old_size
+                        added_sizes[cwd] = (
+                            added_sizes.get(cwd, 0) + int(size) - old_size
+                        )
                 case _:
-                    raise ValueError(
-                        f"Encountered unexpected line type while trying to create directory {name}. {line=}"
-                    )
+                    raise ValueError(f"could not parse {line=}")
+        return cwd, added_sizes
+
+    def add_to_total_sizes(self, added_sizes: Dict[int, int]) -> Dict[int, int]:
+        """
+        Adds the sizes to the total sizes of the directories and all of their ancestors, and returns
+        the total size every changed directory had before.
+        """
+        old_sizes = {}
+        for dir_id, size in added_sizes.items():
+            while dir_id != -1:
+                old_sizes.setdefault(dir_id, self.total_sizes[dir_id])
+                self.total_sizes[dir_id] += size
+                dir_id = self.parents[dir_id]
+        return old_sizes
+
+    def compute_total_sizes(self):
+        """
+        Sums the sizes bottom up in one pass over the ids, every child comes after its parent. Unlike
+        the rest of this file this is a loop that adds into the sizes in place, a fold that copied the
+        sizes for every directory would make the pass quadratic.
+        """
+        self.total_sizes = array("q", self.own_sizes)
+        for dir_id in range(len(self) - 1, ROOT_ID, -1):
+            self.total_sizes[self.parents[dir_id]] += self.total_sizes[dir_id]
+
+    def to_directory_node(self) -> DirectoryNode:
+        """
+        Links the arrays into `DirectoryNode`s, building the children before their parents. Like
+        `compute_total_sizes` this fills a list in place from the last id to the first, so every child
+        exists by the time its parent is built.
+        """
+        # ids only grow, so the (stable) sort keeps every directory's children in id order
+        children_by_parent = {
+            parent: list(child_ids)
+            for parent, child_ids in groupby(
+                sorted(range(1, len(self)), key=self.parents.__getitem__),
+                key=self.parents.__getitem__,
+            )
+        }
+
+        nodes: List[Optional[DirectoryNode]] = [None] * len(self)
+        for dir_id in range(len(self) - 1, -1, -1):
+            nodes[dir_id] = DirectoryNode(
+                self.name(dir_id),
+                self.total_sizes[dir_id],
+                [nodes[child] for child in children_by_parent.get(dir_id, [])],
+            )
+        return nodes[ROOT_ID]
+
+
+def _update_path(position: int, capacity: int) -> Iterator[int]:
+    """The Fenwick tree nodes that cover `position`, from the smallest range to the largest."""
+    return takewhile(
+        lambda i: i <= capacity,
+        accumulate(repeat(None), lambda i, _: i + (i & -i), initial=position),
+    )
+
+
+def _query_path(position: int) -> Iterator[int]:
+    """The Fenwick tree nodes whose ranges add up to the prefix that ends at `position`."""
+    return takewhile(
+        bool, accumulate(repeat(None), lambda i, _: i & (i - 1), initial=position)
+    )
+
+
+class SizeCounts:
+    """
+    Fenwick tree that counts and sums directory sizes. It is indexed by the size itself (size + 1, as
+    the tree is 1 based), and only the nodes that were ever touched are stored, so any size fits and
+    adding a size or asking for a prefix takes O(log(largest size)) steps.
+
+    The capacity is a power of two, and its node always holds the totals of the whole tree. Doubling
+    it only has to copy that node into the new root, as nothing is stored past the old capacity yet.
+    Nodes are updated in place, a copy of the tree per update would cost more than the update itself.
+    """
+
+    def __init__(self):
+        self.capacity = 1
+        self.counts: Dict[int, int] = {}
+        self.sums: Dict[int, int] = {}
+
+    @property
+    def total_count(self) -> int:
+        return self.counts.get(self.capacity, 0)
+
+    def add(self, size: int, count: int = 1):
+        """Adds `count` directories of `size`, a negative count removes them."""
+        assert size >= 0, "sizes can not be negative"
+        while size + 1 > self.capacity:
+            self.counts[2 * self.capacity] = self.counts.get(self.capacity, 0)
+            self.sums[2 * self.capacity] = self.sums.get(self.capacity, 0)
+            self.capacity *= 2
+        for i in _update_path(size + 1, self.capacity):
+            self.counts[i] = self.counts.get(i, 0) + count
+            self.sums[i] = self.sums.get(i, 0) + count * size
+
+    def _prefix(self, table: Dict[int, int], max_size: int) -> int:
+        position = min(max_size + 1, self.capacity) if max_size >= 0 else 0
+        return sum(table.get(i, 0) for i in _query_path(position))
+
+    def count_at_most(self, max_size: int) -> int:
+        return self._prefix(self.counts, max_size)
+
+    def sum_at_most(self, max_size: int) -> int:
+        return self._prefix(self.sums, max_size)
+
+    def nth_smallest(self, n: int) -> int:
+        """The `n`th smallest size, 1 being the smallest, found by walking down from the root."""
+        assert 1 <= n <= self.total_count, f"there is no size number {n}"
+
+        def _descend(state: Tuple[int, int], step: int) -> Tuple[int, int]:
+            # `position` is the largest position known to come before the answer, `n` how many more
+            # sizes there are up to and including the answer
+            position, n = state
+            count = self.counts.get(position + step, 0)
+            return (position + step, n - count) if count < n else (position, n)
+
+        steps = (self.capacity >> shift for shift in range(self.capacity.bit_length()))
+        position, _ = reduce(_descend, steps, (0, n))
+        # the answer is at the next position, positions are sizes + 1
+        return position
 
-        # make sure that we visited all expected directories
-        assert all(
-            [child_dir.name in expected_dirs for child_dir in child_dirs]
-        ), "Did not visit all expected dirs."
-        return DirectoryNode(name, total_size, child_dirs)
 
-    lines_iter = iter(cmd_lines)
-    first_line = next(lines_iter)
-    _, _, cd_target = first_line.split()
+class DirectorySizeIndex:
+    """
+    Counts and sums of the total sizes of every directory in a tree, kept in a `SizeCounts`, so both
+    size queries take O(log(largest size)). More transcript lines can be appended at any time: only the
+    changed directories and their ancestors are updated, each in O(log(largest size)) as well, so
+    appends and queries can be interleaved freely.
 
-    assert (
-        LineType.parse_from_line(first_line) == LineType.CD and cd_target == "/"
-    ), "command lines should start with a cd command on root (/)"
-    return create_dir_helper(cd_target, lines_iter)
+    Unlike the rest of this file the index and its tree are mutable: being updated in place is what lets
+    an append cost as much as the directories it changes rather than the size of the whole tree.
+    """
 
+    def __init__(self, tree: FlatDirectoryTree, cwd: int = ROOT_ID):
+        self.tree = tree
+        self.cwd = cwd
+        self.sizes = SizeCounts()
+        for size in tree.total_sizes:
+            self.sizes.add(size)
 
-with open(os.path.join(os.path.dirname(__file__), "input.txt"), "r") as f:
-    text = f.read()
+    @classmethod
+    def from_lines(cls, cmd_lines: Iterable[str]) -> Self:
+        return cls(*FlatDirectoryTree.from_lines_with_cwd(cmd_lines))
 
-lines = text.split("\n")
+    def append_lines(self, cmd_lines: Iterable[str]):
+        """Adds the output of more commands, which continue from the directory the last ones ended in."""
+        n_dirs = len(self.tree)
+        self.cwd, added_sizes = self.tree.read_lines(cmd_lines, self.cwd)
+        # new directories start out empty
+        self.sizes.add(0, len(self.tree) - n_dirs)
 
-root_directory_node = parse_command_output(lines)
+        old_sizes = self.tree.add_to_total_sizes(added_sizes)
+        for dir_id, old_size in old_sizes.items():
+            self.sizes.add(old_size, -1)
+            self.sizes.add(self.tree.total_sizes[dir_id])
 
-# part1
-nodes_with_size_less_than_max = (
-    root_directory_node.get_all_dirs_under_node_with_size_less_than(100000)
-)
-result1 = sum([node.total_size for node in nodes_with_size_less_than_max])
-print(result1)
+    def sum_sizes_at_most(self, size_limit: int) -> int:
+        """Sum of the total sizes of all directories with a total size of at most `size_limit`."""
+        return self.sizes.sum_at_most(size_limit)
 
-# part2
-total_space = 70000000
-required_space = 30000000
-unused_space = total_space - root_directory_node.total_size
-space_still_needed = required_space - unused_space
+    def smallest_size_at_least(self, min_size: int) -> Optional[int]:
+        """The smallest total size of a directory that is at least `min_size`, if there is one."""
+        n_smaller = self.sizes.count_at_most(min_size - 1)
+        if n_smaller == self.sizes.total_count:
+            return None
+        return self.sizes.nth_smallest(n_smaller + 1)
+
+
+# a snapshot is this header, then one record of 4 little endian int64s per directory (parent id, own
+# size, total size, name id), then the end offset of every name and finally the UTF-8 names
+_SNAPSHOT_HEADER = struct.Struct("<4sIqq")
+_SNAPSHOT_MAGIC = b"DAY7"
+_SNAPSHOT_VERSION = 1
+_RECORD_FIELDS = 4
+
+
+def _little_endian(values: array) -> array:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def save_snapshot(tree: FlatDirectoryTree, path: str):
+    """Writes the parsed tree to a compact binary file that `open_snapshot` can map back in."""
+    names = [name.encode("utf-8") for name in tree.names]
+    records = array(
+        "q",
+        chain.from_iterable(
+            zip(tree.parents, tree.own_sizes, tree.total_sizes, tree.name_ids)
+        ),
+    )
+    name_ends = array("q", accumulate(map(len, names)))
+
+    with open(path, "wb") as f:
+        f.write(
+            _SNAPSHOT_HEADER.pack(
+                _SNAPSHOT_MAGIC, _SNAPSHOT_VERSION, len(tree), len(names)
+            )
+        )
+        _little_endian(records).tofile(f)
+        _little_endian(name_ends).tofile(f)
+        f.write(b"".join(names))
+
+
+@dataclass
+class MappedDirectoryTree:
+    """
+    A read-only `FlatDirectoryTree` backed by a memory mapped snapshot. The arrays are strided views
+    into the records, so nothing is read until it is used and the day's queries work on it unchanged.
+    """
+
+    parents: memoryview
+    own_sizes: memoryview
+    total_sizes: memoryview
+    name_ids: memoryview
+    name_ends: memoryview
+    name_data: memoryview
+    # every view into the mapping, which all have to be released before it can be closed
+    _views: List[memoryview]
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    @classmethod
+    def from_buffer(cls, data: Buffer) -> Self:
+        assert sys.byteorder == "little", "snapshots are mapped as native int64s"
+        magic, version, n_dirs, n_names = _SNAPSHOT_HEADER.unpack_from(data)
+        assert magic == _SNAPSHOT_MAGIC, "not a day7 snapshot"
+        assert version == _SNAPSHOT_VERSION, f"unsupported snapshot {version=}"
+
+        view = memoryview(data)
+        ints = view[
+            _SNAPSHOT_HEADER.size : _SNAPSHOT_HEADER.size
+            + 8 * (_RECORD_FIELDS * n_dirs + n_names)
+        ].cast("q")
+        records = ints[: _RECORD_FIELDS * n_dirs]
+        columns = [records[i::_RECORD_FIELDS] for i in range(_RECORD_FIELDS)]
+        name_ends = ints[_RECORD_FIELDS * n_dirs :]
+        name_data = view[_SNAPSHOT_HEADER.size + 8 * len(ints) :]
+
+        return cls(
+            *columns,
+            name_ends,
+            name_data,
+            [*columns, name_ends, name_data, records, ints, view],
+        )
+
+    def name(self, dir_id: int) -> str:
+        name_id = self.name_ids[dir_id]
+        start = self.name_ends[name_id - 1] if name_id else 0
+        return str(self.name_data[start : self.name_ends[name_id]], "utf-8")
+
+    def release(self):
+        for view in self._views:
+            view.release()
+
+
+@contextmanager
+def open_snapshot(path: str) -> Iterator[MappedDirectoryTree]:
+    """Maps a snapshot written by `save_snapshot` for the duration of the `with` block."""
+    with map_input(path) as data:
+        tree = MappedDirectoryTree.from_buffer(data)
+        try:
+            yield tree
+        finally:
+            tree.release()
+
+
+def parse_command_output(cmd_lines: List[str]) -> DirectoryNode:
+    """parses the command output and returns the root directory node in the file system."""
+    return FlatDirectoryTree.from_lines(cmd_lines).to_directory_node()
+
+
+def sum_small_directory_sizes(tree: FlatDirectoryTree, size_limit: int = 100000) -> int:
+    return sum(size for size in tree.total_sizes if size <= size_limit)
+
+
+def find_directory_to_delete(
+    tree: FlatDirectoryTree,
+    total_space: int = 70000000,
+    required_space: int = 30000000,
+) -> int:
+    """Returns the id of the smallest directory that frees up enough space for the update."""
+    unused_space = total_space - tree.total_sizes[ROOT_ID]
+    space_still_needed = required_space - unused_space
+
+    assert space_still_needed >= 0
+
+    return min(
+        (
+            dir_id
+            for dir_id, size in enumerate(tree.total_sizes)
+            if size >= space_still_needed
+        ),
+        key=tree.total_sizes.__getitem__,
+    )
+
+
+if __name__ == "__main__":
+    with map_input(input_path(__file__)) as data:
+        # the lines are decoded one at a time straight out of the mapped file
+        tree = FlatDirectoryTree.from_lines(
+            str(line, "ascii") for line in iter_lines(data)
+        )
 
-assert space_still_needed >= 0
+    # part1
+    result1 = sum_small_directory_sizes(tree)
+    print(result1)
 
-min_node_to_delete = root_directory_node.find_smallest_directory_larger_than(
-    space_still_needed
-)
-result2 = min_node_to_delete.total_size
-print(result2)
+    # part2
+    result2 = tree.total_sizes[find_directory_to_delete(tree)]
+    print(result2)
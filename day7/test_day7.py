@@ -0,0 +1,201 @@
+import random
+from functools import reduce
+from typing import Dict, List, Tuple
+
+import pytest
+
+from day7 import (
+    DirectorySizeIndex,
+    FlatDirectoryTree,
+    SizeCounts,
+    find_directory_to_delete,
+    open_snapshot,
+    parse_command_output,
+    save_snapshot,
+    sum_small_directory_sizes,
+)
+
+SAMPLE = """$ cd /
+$ ls
+dir a
+14848514 b.txt
+8504156 c.dat
+dir d
+$ cd a
+$ ls
+dir e
+29116 f
+2557 g
+62596 h.lst
+$ cd e
+$ ls
+584 i
+$ cd ..
+$ cd ..
+$ cd d
+$ ls
+4060174 j
+8033020 d.log
+5626152 d.ext
+7214296 k""".split("\n")
+
+
+def _random_transcript(
+    rng: random.Random, n_dirs: int
+) -> Tuple[List[str], Dict[Tuple[str, ...], int]]:
+    """A depth first transcript of a random tree, and the total size of every directory path."""
+    # directory i + 1 goes under one of the directories before it, 0 being the root
+    parents = [rng.randrange(i + 1) for i in range(n_dirs)]
+    names = ["/"] + [f"d{i}" for i in range(n_dirs)]
+    paths = reduce(
+        lambda paths, child: paths + [paths[child[1]] + (names[child[0]],)],
+        enumerate(parents, 1),
+        [("/",)],
+    )
+    children = {
+        path: [names[i] for i, p in enumerate(parents, 1) if p == dir_id]
+        for dir_id, path in enumerate(paths)
+    }
+    own_sizes = {path: rng.randint(0, 1000) for path in paths}
+
+    def _visit(path: Tuple[str, ...]) -> List[str]:
+        listing = ["$ ls"] + [f"dir {c}" for c in children[path]]
+        listing += [f"{own_sizes[path]} f.txt"] if own_sizes[path] else []
+        return listing + [
+            line
+            for c in children[path]
+            for line in [f"$ cd {c}"] + _visit(path + (c,)) + ["$ cd .."]
+        ]
+
+    totals = {
+        path: sum(s for p, s in own_sizes.items() if p[: len(path)] == path)
+        for path in paths
+    }
+    return ["$ cd /"] + _visit(("/",)), totals
+
+
+def test_sample():
+    tree = FlatDirectoryTree.from_lines(SAMPLE)
+
+    assert sum_small_directory_sizes(tree) == 95437
+    assert tree.total_sizes[find_directory_to_delete(tree)] == 24933642
+
+
+def test_total_sizes_match_brute_force():
+    lines, totals = _random_transcript(random.Random(7), 200)
+    root = parse_command_output(lines)
+
+    assert root.total_size == totals[("/",)]
+    assert sorted(d.total_size for d in root.get_all_dirs_under_node()) == sorted(
+        totals.values()
+    )
+    # every directory comes after all of the directories below it
+    dirs = list(root.get_all_dirs_under_node())
+    positions = {id(d): i for i, d in enumerate(dirs)}
+    assert all(positions[id(c)] < positions[id(d)] for d in dirs for c in d.children)
+
+
+def test_size_counts_match_a_sorted_list():
+    rng = random.Random(3)
+    sizes = SizeCounts()
+    expected: List[int] = []
+    for _ in range(500):
+        if expected and rng.random() < 0.3:
+            size = expected.pop(rng.randrange(len(expected)))
+            sizes.add(size, -1)
+        else:
+            size = rng.choice([0, rng.randint(0, 50), rng.randint(0, 10**12)])
+            expected.append(size)
+            sizes.add(size)
+
+        expected.sort()
+        limit = rng.choice(expected + [rng.randint(-1, 10**12)])
+        assert sizes.total_count == len(expected)
+        assert sizes.count_at_most(limit) == sum(1 for s in expected if s <= limit)
+        assert sizes.sum_at_most(limit) == sum(s for s in expected if s <= limit)
+        assert [sizes.nth_smallest(n) for n in range(1, len(expected) + 1)] == expected
+
+
+def test_size_index_matches_rebuilding_after_every_append():
+    lines, _ = _random_transcript(random.Random(11), 100)
+    index = DirectorySizeIndex.from_lines(lines[:1])
+    # appends of uneven lengths, some of which end in the middle of a listing
+    cuts = sorted(random.Random(5).sample(range(2, len(lines)), 40)) + [len(lines)]
+    for start, end in zip([1] + cuts, cuts):
+        index.append_lines(lines[start:end])
+        tree = FlatDirectoryTree.from_lines(lines[:end])
+
+        assert sorted(index.tree.total_sizes) == sorted(tree.total_sizes)
+        for limit in [0, 500, 5000, tree.total_sizes[0]]:
+            assert index.sum_sizes_at_most(limit) == sum(
+                s for s in tree.total_sizes if s <= limit
+            )
+            assert index.smallest_size_at_least(limit) == min(
+                (s for s in tree.total_sizes if s >= limit), default=None
+            )
+        assert index.smallest_size_at_least(tree.total_sizes[0] + 1) is None
+
+
+def test_snapshot_round_trip(tmp_path):
+    lines, _ = _random_transcript(random.Random(13), 150)
+    # names are stored as UTF-8, so one of them takes more than a byte per character
+    lines = [line.replace("d7", "dé7") for line in lines]
+    tree = FlatDirectoryTree.from_lines(lines)
+    path = str(tmp_path / "tree.snapshot")
+    save_snapshot(tree, path)
+
+    with open_snapshot(path) as mapped:
+        assert len(mapped) == len(tree)
+        assert list(mapped.parents) == list(tree.parents)
+        assert list(mapped.own_sizes) == list(tree.own_sizes)
+        assert list(mapped.total_sizes) == list(tree.total_sizes)
+        assert [mapped.name(i) for i in range(len(mapped))] == [
+            tree.name(i) for i in range(len(tree))
+        ]
+        assert sum_small_directory_sizes(mapped) == sum_small_directory_sizes(tree)
+        # a disk just big enough that only some of the directories free up enough space
+        disk = (tree.total_sizes[0], tree.total_sizes[0] // 2)
+        assert find_directory_to_delete(mapped, *disk) == find_directory_to_delete(
+            tree, *disk
+        )
+        parents = mapped.parents
+
+    # the views into the mapping do not outlive it
+    with pytest.raises(ValueError):
+        parents[0]
+
+
+def test_open_snapshot_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a.snapshot"
+    path.write_bytes(b"\0" * 64)
+
+    with pytest.raises(AssertionError, match="not a day7 snapshot"):
+        with open_snapshot(str(path)):
+            pass
+
+
+def test_listed_directories_that_are_never_entered_are_empty():
+    tree = FlatDirectoryTree.from_lines(
+        ["$ cd /", "$ ls", "dir a", "dir b", "10 f", "$ cd b", "$ ls", "5 g"]
+    )
+
+    assert [tree.name(i) for i in range(len(tree))] == ["/", "a", "b"]
+    assert list(tree.total_sizes) == [15, 0, 5]
+    assert [(d.name, d.total_size) for d in tree.to_directory_node().children] == [
+        ("a", 0),
+        ("b", 5),
+    ]
+
+
+def test_listing_a_directory_again_does_not_count_its_files_twice():
+    index = DirectorySizeIndex.from_lines(["$ cd /", "$ ls", "100 a.txt"])
+    index.append_lines(["$ ls", "100 a.txt", "50 b.txt", "dir c"])
+    assert list(index.tree.total_sizes) == [150, 0]
+
+    # entering a directory again and listing a file that shrank
+    index.append_lines(["$ cd c", "$ ls", "30 d.txt", "$ cd /", "$ ls", "20 a.txt"])
+    index.append_lines(["$ cd c", "$ ls", "30 d.txt"])
+    assert list(index.tree.total_sizes) == [100, 30]
+    assert index.sum_sizes_at_most(100) == 130
+    assert index.smallest_size_at_least(31) == 100
+    assert index.smallest_size_at_least(1) == 30
@@ -1,9 +1,20 @@
+import heapq
 import os
 import sys
-from dataclasses import dataclass
-from functools import partial, reduce
-from itertools import product
-from typing import List, Set, Tuple
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import accumulate, product
+from typing import List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # the visibility mask needs numpy, the list based solution does not
+    np = None
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from grid import Grid  # noqa: E402
+from puzzle_input import Buffer, input_path, map_input  # noqa: E402
 
 """
 We need to count all trees on the outside edges.
@@ -25,167 +36,419 @@ return a set of coordinates that can then be merged with the currently selected
 """
 
 
-def tree_counter(grid: List[List[int]]) -> int:
-    @dataclass(frozen=True)
-    class _TreeScanResult:
-        visible_trees: List[bool]
-        max_tree: int
+def _visible_positions(line: Sequence[int]) -> Set[int]:
+    """
+    Returns the positions of the trees visible from the start or the end of the line. Only the first
+    and the last tree of every height can be visible, so instead of comparing every tree against a
+    running maximum, the heights are walked from the tallest down and each one is looked up with a
+    single `find` and `rfind`.
+    """
+    trees = bytes(line)
+    tallest_first = range(max(trees, default=-1), -1, -1)
 
-        @classmethod
-        def default(cls, size: int):
-            return _TreeScanResult([False] * size, -sys.maxsize)
+    # a tree is visible from the start when it comes before the first tree of every taller height,
+    # heights that are missing are put past the end so they never hide anything
+    firsts = [len(trees) if p == -1 else p for p in map(trees.find, tallest_first)]
+    nearest_taller_before = accumulate(firsts, min, initial=len(trees))
+    lasts = list(map(trees.rfind, tallest_first))
+    nearest_taller_after = accumulate(lasts, max, initial=-1)
 
-    def _scan_trees(cur_result: _TreeScanResult, i: int, val: int) -> _TreeScanResult:
-        visible_trees = cur_result.visible_trees[:]
+    return {p for p, taller in zip(firsts, nearest_taller_before) if p < taller} | {
+        p for p, taller in zip(lasts, nearest_taller_after) if p > taller
+    }
 
-        is_new_max = val > cur_result.max_tree
 
-        if is_new_max:
-            visible_trees[i] = True
+def _visible_from_either_end(line: Sequence[int]) -> List[bool]:
+    visible = _visible_positions(line)
+    return [i in visible for i in range(len(line))]
 
-        return _TreeScanResult(
-            visible_trees, val if is_new_max else cur_result.max_tree
-        )
 
-    def _get_visible_trees_in_row(
-        i: int, row: List[int], reversed: bool
-    ) -> Set[Tuple[int, int]]:
-        n = len(row)
-        trees_in_order = row if not reversed else row[::-1]
-        scan_result = reduce(
-            lambda accum, index_and_val: _scan_trees(
-                accum, index_and_val[0], index_and_val[1]
-            ),
-            enumerate(trees_in_order),
-            _TreeScanResult.default(n),
-        )
+def tree_counter(grid: Grid) -> int:
+    # at most two trees of every height are visible in a line, so the sets of visible cells stay small
+    visible_in_rows = (
+        {i * grid.width + j for j in _visible_positions(row)}
+        for i, row in enumerate(grid.rows())
+    )
+    visible_in_columns = (
+        {i * grid.width + j for i in _visible_positions(column)}
+        for j, column in enumerate(grid.columns())
+    )
+    return len(set().union(*visible_in_rows, *visible_in_columns))
 
-        return set(
-            (
-                (i, k if not reversed else (n - 1) - k)
-                for k, is_visible in enumerate(scan_result.visible_trees)
-                if is_visible
-            )
-        )
 
-    def _get_visible_trees_in_col(
-        j: int, col: List[int], reversed: bool
-    ) -> Set[Tuple[int, int]]:
-        n = len(col)
-        trees_in_order = col if not reversed else col[::-1]
-        scan_result = reduce(
-            lambda accum, index_and_val: _scan_trees(
-                accum, index_and_val[0], index_and_val[1]
-            ),
-            enumerate(trees_in_order),
-            _TreeScanResult.default(n),
-        )
+def load_heights(data: Buffer) -> "np.ndarray":
+    """Reads the digit grid into a (rows, columns) uint8 array with one bulk conversion."""
+    digits = np.frombuffer(data, dtype=np.uint8)
+    width = int(np.argmax(digits == ord("\n"))) or len(digits)
+    # every row but the last is followed by a newline, which becomes a column that is dropped
+    rows = np.resize(digits, (len(digits) + 1) // (width + 1) * (width + 1))
+    return rows.reshape(-1, width + 1)[:, :width] - ord("0")
 
-        return set(
-            (
-                (k if not reversed else (n - 1) - k, j)
-                for k, is_visible in enumerate(scan_result.visible_trees)
-                if is_visible
-            )
-        )
 
-    trees_visible_from_left = reduce(
-        lambda accum, i_and_row: accum
-        | _get_visible_trees_in_row(i_and_row[0], i_and_row[1], reversed=False),
-        enumerate(grid),
-        set(),
-    )
+def _lines_along(grid: "np.ndarray", axis: int, reverse: bool) -> "np.ndarray":
+    """A view of the grid where the first axis walks along `axis`, backwards when `reverse`."""
+    lines = np.moveaxis(grid, axis, 0)
+    return lines[::-1] if reverse else lines
+
+
+def _mark_visible_from_start(
+    heights: "np.ndarray", visible: "np.ndarray", axis: int, reverse: bool
+):
+    """Marks the trees visible looking along `axis`, starting from the end when `reverse`."""
+    lines = _lines_along(heights, axis, reverse)
+    visible_lines = _lines_along(visible, axis, reverse)
+
+    running_max = np.maximum.accumulate(lines, axis=0)
+    visible_lines[0] = True
+    visible_lines[1:] |= lines[1:] > running_max[:-1]
+
+
+def visibility_mask(heights: "np.ndarray") -> "np.ndarray":
+    """
+    Returns which trees are visible from outside the grid. A tree is visible from one side when it is
+    taller than the running maximum of the trees before it, which `np.maximum.accumulate` gives for
+    every row or column at once.
+    """
+    visible = np.zeros(heights.shape, dtype=bool)
+    _mark_visible_from_start(heights, visible, axis=0, reverse=False)
+    _mark_visible_from_start(heights, visible, axis=0, reverse=True)
+    _mark_visible_from_start(heights, visible, axis=1, reverse=False)
+    _mark_visible_from_start(heights, visible, axis=1, reverse=True)
+    return visible
+
 
-    trees_visible_from_right = reduce(
-        lambda accum, i_and_row: accum
-        | _get_visible_trees_in_row(i_and_row[0], i_and_row[1], reversed=True),
-        enumerate(grid),
-        set(),
+def _viewing_distances_from_start(
+    heights: "np.ndarray", axis: int, reverse: bool
+) -> "np.ndarray":
+    """
+    Vectorized `viewing_distances_towards_start` along `axis` for every line of the grid at once. As
+    heights are digits, the closest blocking tree of every height is a running maximum of the
+    positions of the trees at least that tall, one `np.maximum.accumulate` per height.
+
+    Unlike the rest of this file the 10 passes are a loop that writes into preallocated arrays: a
+    band can be millions of trees, and building new arrays for every pass would allocate several
+    grid-sized temporaries per height instead of reusing one buffer.
+    """
+    distances = np.zeros(heights.shape, dtype=np.int32)
+    lines = _lines_along(heights, axis, reverse)
+    distance_lines = _lines_along(distances, axis, reverse)
+    positions = np.arange(lines.shape[0], dtype=np.int32).reshape(
+        -1, *[1] * (lines.ndim - 1)
     )
 
-    trees_visible_from_top = reduce(
-        lambda accum, j_and_col: accum
-        | _get_visible_trees_in_col(j_and_col[0], j_and_col[1], reversed=False),
-        enumerate(zip(*grid)),
-        set(),
+    blockers = np.empty(lines.shape, dtype=np.int32)
+    for height in range(10):
+        # without a blocking tree the view reaches the edge at position 0, which gives the same
+        # distance as a blocking tree there
+        np.multiply(lines >= height, positions, out=blockers)
+        np.maximum.accumulate(blockers, axis=0, out=blockers)
+        np.subtract(positions[1:], blockers[:-1], out=blockers[:-1])
+        np.copyto(distance_lines[1:], blockers[:-1], where=lines[1:] == height)
+
+    return distances
+
+
+# bands are sized so one band of heights takes about this many bytes in a worker
+_BAND_BYTES = 1 << 22
+
+
+def _map_heights(path: str) -> "np.ndarray":
+    """
+    Maps the digit file as a read-only (rows, columns) view of ASCII digits, skipping the newlines
+    with the row stride, so nothing is read until a band is sliced out of it.
+    """
+    with open(path, "rb") as f:
+        width = len(f.readline().rstrip(b"\n"))
+    digits = np.memmap(path, dtype=np.uint8, mode="r")
+    height = (len(digits) + 1) // (width + 1)
+    return np.lib.stride_tricks.as_strided(
+        digits, shape=(height, width), strides=(width + 1, 1), writeable=False
     )
 
-    trees_visible_from_bottom = reduce(
-        lambda accum, j_and_col: accum
-        | _get_visible_trees_in_col(j_and_col[0], j_and_col[1], reversed=True),
-        enumerate(zip(*grid)),
-        set(),
+
+def _band_ranges(length: int, band_size: int) -> List[Tuple[int, int]]:
+    return [
+        (start, min(start + band_size, length)) for start in range(0, length, band_size)
+    ]
+
+
+def _row_score_dtype(width: int) -> "np.dtype":
+    """
+    The smallest dtype that holds the product of the left and right viewing distances. They add up to
+    at most `width - 1`, so the product is largest when they are about equal.
+    """
+    return np.min_scalar_type(((width - 1) // 2) * (width // 2))
+
+
+def _create_spill(work_dir: str, name: str, dtype, shape: Tuple[int, int]):
+    # the workers fill the file in band by band, so it is never fully in memory
+    path = os.path.join(work_dir, f"{name}.npy")
+    np.lib.format.open_memmap(path, "w+", dtype, shape).flush()
+
+
+def _open_spill(work_dir: str, name: str) -> "np.ndarray":
+    return np.lib.format.open_memmap(os.path.join(work_dir, f"{name}.npy"), "r")
+
+
+def _write_spill(work_dir: str, name: str, start: int, band: "np.ndarray"):
+    """Writes the results of the rows from `start` on into the transposed spill file."""
+    spill = np.lib.format.open_memmap(os.path.join(work_dir, f"{name}.npy"), "r+")
+    # the mapping is shared, so the other workers see the write without flushing it to disk first
+    spill[:, start : start + band.shape[0]] = band.T
+
+
+def _analyse_row_band(path: str, work_dir: str, rows: Tuple[int, int]):
+    """
+    Stores the heights, the visibility from the left and right and the product of the viewing
+    distances towards them, all transposed so a band of columns is contiguous in the spill files.
+    """
+    start, end = rows
+    heights = _map_heights(path)[start:end] - ord("0")
+
+    band_visible = np.zeros(heights.shape, dtype=bool)
+    _mark_visible_from_start(heights, band_visible, axis=1, reverse=False)
+    _mark_visible_from_start(heights, band_visible, axis=1, reverse=True)
+    to_left = _viewing_distances_from_start(heights, axis=1, reverse=False)
+    to_right = _viewing_distances_from_start(heights, axis=1, reverse=True)
+
+    _write_spill(work_dir, "heights", start, heights)
+    _write_spill(work_dir, "visible", start, band_visible)
+    _write_spill(
+        work_dir,
+        "scores",
+        start,
+        to_left.astype(np.uint64) * to_right.astype(np.uint64),
     )
 
-    return len(
-        trees_visible_from_left
-        | trees_visible_from_right
-        | trees_visible_from_top
-        | trees_visible_from_bottom
+
+def _analyse_column_band(work_dir: str, columns: Tuple[int, int]) -> Tuple[int, int]:
+    """Combines the row results with the top and bottom directions, returns (visible, best score)."""
+    start, end = columns
+    # the spill files are transposed, turning the band back in memory keeps the sweeps running along
+    # contiguous rows, which numpy does several times faster than sweeping along axis 1
+    heights = np.array(_open_spill(work_dir, "heights")[start:end].T, order="C")
+    band_visible = np.array(_open_spill(work_dir, "visible")[start:end].T, order="C")
+    row_scores = _open_spill(work_dir, "scores")[start:end].T
+
+    _mark_visible_from_start(heights, band_visible, axis=0, reverse=False)
+    _mark_visible_from_start(heights, band_visible, axis=0, reverse=True)
+    to_top = _viewing_distances_from_start(heights, axis=0, reverse=False)
+    to_bottom = _viewing_distances_from_start(heights, axis=0, reverse=True)
+    band_scores = (
+        row_scores.astype(np.uint64)
+        * to_top.astype(np.uint64)
+        * to_bottom.astype(np.uint64)
     )
+    return int(band_visible.sum()), int(band_scores.max(initial=0))
 
 
-def distance_to_gte_or_end(
-    iter, val: int, have_encountered_larger_value: bool = False
-) -> int:
+def analyse_large_grid(
+    path: str,
+    band_size: Optional[int] = None,
+    n_workers: Optional[int] = None,
+    work_dir: Optional[str] = None,
+) -> Tuple[int, int]:
     """
-    Calculates how many iterations occur before the end of the iterator or until a greater than or equal
-    to the value passed in is encountered.
+    Returns the number of visible trees and the highest scenic score of a digit file that does not
+    have to fit in memory. Bands of rows are read from the file and analysed left to right in a
+    process pool. Their results are spilled, transposed, to memory mapped files, so the bands of
+    columns that add the top to bottom directions read contiguous lines of 2 bytes per tree plus the
+    row scores instead of striding over the whole input again. Only the per-band counts and maximums
+    are merged at the end.
+
+    The spill files go to a temporary directory inside `work_dir`, which defaults to the system
+    temporary directory. That is often a tmpfs held in memory, so point it at a disk for grids that
+    really do not fit in memory.
     """
-    if have_encountered_larger_value:
-        return 0
+    height, width = _map_heights(path).shape
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as spill_dir:
+        _create_spill(spill_dir, "heights", np.uint8, (width, height))
+        _create_spill(spill_dir, "visible", bool, (width, height))
+        _create_spill(spill_dir, "scores", _row_score_dtype(width), (width, height))
 
-    did_encounter_larger_value = False
-    try:
-        next_value = next(iter)
-        if next_value >= val:
-            did_encounter_larger_value = True
-    except StopIteration:
-        return 0
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            row_bands = _band_ranges(height, band_size or max(1, _BAND_BYTES // width))
+            list(executor.map(partial(_analyse_row_band, path, spill_dir), row_bands))
 
-    return 1 + distance_to_gte_or_end(iter, val, did_encounter_larger_value)
+            column_bands = _band_ranges(
+                width, band_size or max(1, _BAND_BYTES // height)
+            )
+            band_results = list(
+                executor.map(partial(_analyse_column_band, spill_dir), column_bands)
+            )
 
+    visible_counts, best_scores = zip(*band_results)
+    return sum(visible_counts), max(best_scores)
 
-def calculate_scenic_score(i: int, j: int, grid: List[List[int]]) -> int:
-    val = grid[i][j]
-    m, n = len(grid), len(grid[0])
 
-    score_to_right = (
-        distance_to_gte_or_end(iter(grid[i][j + 1 :]), val) if i != m - 1 else 0
-    )
-    score_to_left = (
-        distance_to_gte_or_end(iter(grid[i][j - 1 :: -1]), val) if i != 0 else 0
+def distance_to_gte_or_end(trees: Sequence[int], val: int) -> int:
+    """
+    Calculates how many trees are passed before the end of the line or until a tree greater than or
+    equal to the value passed in is encountered, including that tree.
+    """
+    return next(
+        (distance for distance, tree in enumerate(trees, 1) if tree >= val), len(trees)
     )
-    score_to_bottom = (
-        distance_to_gte_or_end(iter(list(zip(*grid))[j][i + 1 :]), val)
-        if j != n - 1
-        else 0
+
+
+def calculate_scenic_score(i: int, j: int, grid: Grid) -> int:
+    val = grid[i, j]
+
+    score_to_right = distance_to_gte_or_end(grid.row(i)[j + 1 :], val)
+    score_to_left = distance_to_gte_or_end(
+        grid.row(i, reverse=True)[grid.width - j :], val
     )
-    score_to_top = (
-        distance_to_gte_or_end(iter(list(zip(*grid))[j][i - 1 :: -1]), val)
-        if j != 0
-        else 0
+    score_to_bottom = distance_to_gte_or_end(grid.column(j)[i + 1 :], val)
+    score_to_top = distance_to_gte_or_end(
+        grid.column(j, reverse=True)[grid.height - i :], val
     )
 
     result = score_to_right * score_to_left * score_to_top * score_to_bottom
     return result
 
 
-with open(os.path.join(os.path.dirname(__file__), "input.txt"), "r") as f:
-    text = f.read()
+def viewing_distances_towards_start(line: Sequence[int]) -> List[int]:
+    """
+    For every tree in the line, counts the trees it can see looking back towards the start of the
+    line: up to and including the first tree at least as tall, or up to the edge. The stack only holds
+    trees that are taller than every tree after them, so every tree is pushed and popped at most once.
 
-lines = text.split("\n")
+    Unlike the rest of this file this is a loop over a mutable stack: a fold would have to copy the
+    stack, or a table of blockers per height, for every tree, which made the sweep about 2x slower for
+    digits and scales with the tallest height for anything taller.
+    """
+    distances = []
+    taller_trees = []
+    for i, height in enumerate(line):
+        while taller_trees and line[taller_trees[-1]] < height:
+            taller_trees.pop()
+        distances.append(i - taller_trees[-1] if taller_trees else i)
+        taller_trees.append(i)
+    return distances
 
-grid = [[int(c) for c in line] for line in lines]
 
-result1 = tree_counter(grid)
-print(result1)
+def calculate_scenic_scores(grid: Grid) -> Tuple[List[List[int]], int]:
+    """
+    Returns the scenic score of every tree and the highest one, from one linear sweep over the grid in
+    each direction.
+    """
+    to_left = map(viewing_distances_towards_start, grid.rows())
+    to_right = (
+        viewing_distances_towards_start(row)[::-1] for row in grid.rows(reverse=True)
+    )
+    to_top = zip(*map(viewing_distances_towards_start, grid.columns()))
+    to_bottom = zip(
+        *(
+            viewing_distances_towards_start(col)[::-1]
+            for col in grid.columns(reverse=True)
+        )
+    )
 
-result2 = max(
-    [
-        calculate_scenic_score(i, j, grid)
-        for i in range(len(grid))
-        for j in range(len(grid[0]))
+    scores = [
+        [left * right * top * bottom for left, right, top, bottom in zip(*distances)]
+        for distances in zip(to_left, to_right, to_top, to_bottom)
     ]
-)
-print(result2)
+    return scores, max(map(max, scores))
+
+
+def find_max_scenic_score(grid: Grid) -> int:
+    _, max_score = calculate_scenic_scores(grid)
+    return max_score
+
+
+def _scan_line(line: Sequence[int]) -> Tuple[List[bool], List[int]]:
+    """
+    Returns which trees of the line are visible from either end of it, and the product of the
+    viewing distances towards both ends.
+    """
+    to_start = viewing_distances_towards_start(line)
+    to_end = viewing_distances_towards_start(line[::-1])[::-1]
+    return _visible_from_either_end(line), [a * b for a, b in zip(to_start, to_end)]
+
+
+class ForestModel:
+    """
+    Keeps the number of visible trees and the best scenic score up to date while tree heights change.
+    The results of every row and every column are kept separately, and a tree only depends on its own
+    row and column, so changing a height only rescans that row and that column.
+
+    Unlike the rest of this file the model is mutable: it is updated in place because rebuilding the
+    results or the score heap for every change would cost as much as recomputing everything.
+    """
+
+    def __init__(self, grid: Grid):
+        self.grid = grid.copy()
+        # row_results[i] and column_results[j] are the `_scan_line` results of that line
+        self.row_results = list(map(_scan_line, self.grid.rows()))
+        self.column_results = list(map(_scan_line, self.grid.columns()))
+
+        self.visible_count = sum(
+            self.is_visible(i, j)
+            for i, j in product(range(self.grid.height), range(self.grid.width))
+        )
+        self._rebuild_score_heap()
+
+    def is_visible(self, i: int, j: int) -> bool:
+        return self.row_results[i][0][j] or self.column_results[j][0][i]
+
+    def scenic_score(self, i: int, j: int) -> int:
+        return self.row_results[i][1][j] * self.column_results[j][1][i]
+
+    def _rebuild_score_heap(self):
+        # max heap of (-score, i, j), entries whose score changed since are skipped when popped
+        self._score_heap = [
+            (-self.scenic_score(i, j), i, j)
+            for i, j in product(range(self.grid.height), range(self.grid.width))
+        ]
+        heapq.heapify(self._score_heap)
+
+    @property
+    def best_scenic_score(self) -> int:
+        heap = self._score_heap
+        while -heap[0][0] != self.scenic_score(heap[0][1], heap[0][2]):
+            heapq.heappop(heap)
+        return -heap[0][0]
+
+    def set_height(self, i: int, j: int, height: int):
+        """Changes the height of one tree, rescanning only its row and its column."""
+        affected = [(i, col) for col in range(self.grid.width)] + [
+            (row, j) for row in range(self.grid.height) if row != i
+        ]
+        old_scores = [self.scenic_score(*cell) for cell in affected]
+        self.visible_count -= sum(self.is_visible(*cell) for cell in affected)
+
+        self.grid[i, j] = height
+        self.row_results[i] = _scan_line(self.grid.row(i))
+        self.column_results[j] = _scan_line(self.grid.column(j))
+
+        self.visible_count += sum(self.is_visible(*cell) for cell in affected)
+
+        changed_scores = [
+            (-score, *cell)
+            for cell, old_score in zip(affected, old_scores)
+            for score in [self.scenic_score(*cell)]
+            if score != old_score
+        ]
+        # stale entries pile up with every update, so the heap is rebuilt once they outnumber the
+        # trees, which keeps the amortised cost of an update linear in the row and column length
+        if len(self._score_heap) + len(changed_scores) > 2 * len(self.grid.cells):
+            self._rebuild_score_heap()
+        else:
+            for entry in changed_scores:
+                heapq.heappush(self._score_heap, entry)
+
+
+if __name__ == "__main__":
+    with map_input(input_path(__file__)) as data:
+        grid = Grid.from_digits(data)
+        heights = load_heights(data) if np is not None else None
+
+    if heights is not None:
+        result1 = int(visibility_mask(heights).sum())
+    else:
+        result1 = tree_counter(grid)
+    print(result1)
+
+    result2 = find_max_scenic_score(grid)
+    print(result2)
@@ -0,0 +1,137 @@
+import random
+from typing import List
+
+import pytest
+
+from day8 import (
+    ForestModel,
+    analyse_large_grid,
+    calculate_scenic_score,
+    calculate_scenic_scores,
+    find_max_scenic_score,
+    load_heights,
+    np,
+    tree_counter,
+    viewing_distances_towards_start,
+    visibility_mask,
+)
+from grid import Grid
+
+SAMPLE = b"""30373
+25512
+65332
+33549
+35390"""
+
+
+def _random_grid(rng: random.Random, height: int, width: int) -> Grid:
+    # few distinct heights make for many ties, which is where the views are cut short
+    return Grid.from_rows(
+        [[rng.randrange(4) for _ in range(width)] for _ in range(height)]
+    )
+
+
+def _brute_force_distances(line: List[int]) -> List[int]:
+    return [
+        next((d for d, tree in enumerate(line[:i][::-1], 1) if tree >= height), i)
+        for i, height in enumerate(line)
+    ]
+
+
+@pytest.mark.parametrize("max_height", [10, 256])
+@pytest.mark.parametrize("seed", range(5))
+def test_viewing_distances_match_brute_force(seed, max_height):
+    rng = random.Random(seed)
+    line = [rng.randrange(max_height) for _ in range(rng.randrange(50))]
+
+    assert viewing_distances_towards_start(line) == _brute_force_distances(line)
+
+
+@pytest.mark.parametrize("shape", [(5, 5), (1, 7), (7, 1), (9, 13)])
+def test_scenic_scores_match_scoring_every_tree(shape):
+    grid = _random_grid(random.Random(sum(shape)), *shape)
+    scores, best = calculate_scenic_scores(grid)
+
+    assert scores == [
+        [calculate_scenic_score(i, j, grid) for j in range(grid.width)]
+        for i in range(grid.height)
+    ]
+    assert best == max(map(max, scores))
+
+
+def test_sample():
+    grid = Grid.from_digits(SAMPLE)
+
+    assert calculate_scenic_scores(grid)[1] == 8
+    assert [calculate_scenic_score(i, j, grid) for i, j in [(1, 2), (3, 2)]] == [4, 8]
+
+
+def _grid_text(grid: Grid) -> str:
+    return "\n".join("".join(map(str, row)) for row in grid.rows())
+
+
+def _write_grid(path, grid: Grid) -> str:
+    path.write_text(_grid_text(grid))
+    return str(path)
+
+
+@pytest.mark.skipif(np is None, reason="the large grid analysis needs numpy")
+@pytest.mark.parametrize("band_size", [1, 3, None])
+def test_large_grid_matches_the_in_memory_grid(tmp_path, band_size):
+    grid = _random_grid(random.Random(band_size), 11, 17)
+    path = _write_grid(tmp_path / "grid.txt", grid)
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+
+    assert analyse_large_grid(path, band_size, 2, str(work_dir)) == (
+        tree_counter(grid),
+        find_max_scenic_score(grid),
+    )
+    # the spill files are removed with their temporary directory
+    assert not any(work_dir.iterdir())
+
+
+@pytest.mark.skipif(np is None, reason="the large grid analysis needs numpy")
+def test_large_grid_row_scores_do_not_overflow(tmp_path):
+    # 16 trees on either side of the tall one make a row score of 256, too big for a uint8
+    grid = Grid.from_rows([[0] * 33, [0] * 16 + [9] + [0] * 16, [0] * 33])
+    path = _write_grid(tmp_path / "grid.txt", grid)
+
+    assert analyse_large_grid(path, 2, 1) == (tree_counter(grid), 256)
+
+
+@pytest.mark.parametrize("shape", [(6, 6), (1, 5), (8, 3)])
+def test_forest_model_matches_recomputing_after_every_change(shape):
+    rng = random.Random(shape[0] * shape[1])
+    grid = _random_grid(rng, *shape)
+    model = ForestModel(grid)
+
+    # enough changes for the score heap to be rebuilt a few times
+    for _ in range(20 * grid.width * grid.height):
+        i, j = rng.randrange(grid.height), rng.randrange(grid.width)
+        height = rng.randrange(10)
+        model.set_height(i, j, height)
+        grid[i, j] = height
+
+        assert model.visible_count == tree_counter(grid)
+        assert model.best_scenic_score == find_max_scenic_score(grid)
+
+
+def test_forest_model_does_not_change_the_grid_it_was_built_from():
+    grid = Grid.from_digits(SAMPLE)
+    model = ForestModel(grid)
+    model.set_height(2, 2, 9)
+
+    assert grid == Grid.from_digits(SAMPLE)
+    assert model.grid[2, 2] == 9
+
+
+@pytest.mark.skipif(np is None, reason="the visibility mask needs numpy")
+@pytest.mark.parametrize("trailing_newline", [False, True])
+@pytest.mark.parametrize("shape", [(1, 1), (5, 5), (1, 9), (9, 1), (12, 7)])
+def test_visibility_mask_matches_tree_counter(shape, trailing_newline):
+    grid = _random_grid(random.Random(sum(shape)), *shape)
+    heights = load_heights((_grid_text(grid) + "\n" * trailing_newline).encode())
+
+    assert heights.tolist() == [list(row) for row in grid.rows()]
+    assert int(visibility_mask(heights).sum()) == tree_counter(grid)
@@ -1,10 +1,15 @@
 import enum
 import os
+import re
+import sys
 from dataclasses import dataclass
 from functools import reduce
 from itertools import accumulate
 from typing import List, Tuple, Self
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from puzzle_input import Buffer, extract_ints, input_path, map_input  # noqa: E402
+
 
 class Direction(enum.Enum):
     U = 1
@@ -124,26 +129,41 @@ def parse_move_commands(lines: List[str]) -> List[MoveCommand]:
     return [MoveCommand.from_str(line) for line in lines]
 
 
-with open(os.path.join(os.path.dirname(__file__), "input.txt"), "r") as f:
-    text = f.read()
+def parse_move_commands_in_bulk(data: Buffer) -> List[MoveCommand]:
+    """Reads all directions and all step counts in one scan each instead of splitting every line."""
+    directions = re.findall(rb"[UDLR]", data)
+    steps = extract_ints(data)
+    assert len(directions) == len(
+        steps
+    ), "every move needs a direction and a step count"
+
+    directions_by_name = {d.name.encode("ascii"): d for d in Direction}
+    return [
+        MoveCommand(directions_by_name[direction], n)
+        for direction, n in zip(directions, steps)
+    ]
+
+
+def count_tail_positions(move_commands: List[MoveCommand], n_knots: int) -> int:
+    """Returns how many unique positions the last knot of a rope with `n_knots` knots visits."""
+    positions = reduce(
+        simulate_rope_movement,
+        move_commands,
+        [RopePosition([(0, 0) for _ in range(n_knots)])],
+    )
 
-lines = text.split("\n")
-move_commands = parse_move_commands(lines)
+    unique_tail_positions = set([position.knot_positions[-1] for position in positions])
+    return len(unique_tail_positions)
 
-# part 1
-positions = reduce(
-    simulate_rope_movement, move_commands, [RopePosition([(0, 0), (0, 0)])]
-)
 
-unique_tail_positions = set([position.knot_positions[-1] for position in positions])
-result1 = len(unique_tail_positions)
-print(result1)
+if __name__ == "__main__":
+    with map_input(input_path(__file__)) as data:
+        move_commands = parse_move_commands_in_bulk(data)
 
-# part 2
-positions = reduce(
-    simulate_rope_movement, move_commands, [RopePosition([(0, 0) for _ in range(10)])]
-)
+    # part 1
+    result1 = count_tail_positions(move_commands, 2)
+    print(result1)
 
-unique_tail_positions = set([position.knot_positions[-1] for position in positions])
-result2 = len(unique_tail_positions)
-print(result2)
+    # part 2
+    result2 = count_tail_positions(move_commands, 10)
+    print(result2)
@@ -0,0 +1,77 @@
+"""
+A grid of small integers stored row-major in one bytearray, one byte per cell. Rows and columns are
+handed out as memoryviews into that bytearray, so walking a column, or a row or column backwards, never
+copies or transposes anything.
+
+The days import this module after adding the repository root to `sys.path`.
+"""
+
+from dataclasses import dataclass
+from itertools import chain
+from typing import Iterable, Iterator, Self, Tuple
+
+from puzzle_input import Buffer
+
+# maps the ASCII digits to their values, bytearray.translate does the whole conversion in one call
+_DIGIT_VALUES = bytes(range(256)).replace(b"0123456789", bytes(range(10)))
+
+
+@dataclass
+class Grid:
+    cells: bytearray
+    width: int
+    height: int
+
+    def __post_init__(self):
+        assert len(self.cells) == self.width * self.height, "cells do not fill the grid"
+
+    @classmethod
+    def from_digits(cls, data: Buffer) -> Self:
+        """Loads a grid of digits with one row per line."""
+        cells = bytearray(data)
+        width = cells.find(b"\n")
+        width = len(cells) if width == -1 else width
+        cells = cells.translate(_DIGIT_VALUES, b"\r\n")
+        return cls(cells, width, len(cells) // width if width else 0)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Iterable[int]]) -> Self:
+        rows = [bytes(row) for row in rows]
+        return cls(
+            bytearray(chain.from_iterable(rows)), len(rows[0]) if rows else 0, len(rows)
+        )
+
+    def copy(self) -> Self:
+        return type(self)(bytearray(self.cells), self.width, self.height)
+
+    def __getitem__(self, position: Tuple[int, int]) -> int:
+        i, j = position
+        return self.cells[i * self.width + j]
+
+    def __setitem__(self, position: Tuple[int, int], value: int):
+        i, j = position
+        self.cells[i * self.width + j] = value
+
+    # the views are made on demand, as a Grid holding a memoryview could not be pickled or copied
+    def row(self, i: int, reverse: bool = False) -> memoryview:
+        """A view of row `i`, from right to left when `reverse`."""
+        start = i * self.width
+        if reverse:
+            return memoryview(self.cells)[
+                start + self.width - 1 : start - 1 if start else None : -1
+            ]
+        return memoryview(self.cells)[start : start + self.width]
+
+    def column(self, j: int, reverse: bool = False) -> memoryview:
+        """A view of column `j`, from bottom to top when `reverse`."""
+        if reverse:
+            return memoryview(self.cells)[
+                (self.height - 1) * self.width + j :: -self.width
+            ]
+        return memoryview(self.cells)[j :: self.width]
+
+    def rows(self, reverse: bool = False) -> Iterator[memoryview]:
+        return (self.row(i, reverse) for i in range(self.height))
+
+    def columns(self, reverse: bool = False) -> Iterator[memoryview]:
+        return (self.column(j, reverse) for j in range(self.width))
@@ -0,0 +1,63 @@
+"""
+Shared loader for the puzzle inputs. Inputs are memory mapped instead of read into a string and split,
+so nothing is copied until a day actually asks for a line, a record or the numbers in it.
+
+The days import this module after adding the repository root to `sys.path`.
+"""
+
+import mmap
+import os
+import re
+from contextlib import contextmanager, suppress
+from typing import Iterator, List, Union
+
+Buffer = Union[bytes, bytearray, memoryview, mmap.mmap]
+
+# a "-" only makes a number negative when it does not come right after a digit, so ranges like
+# "2-4" are read as 2 and 4
+_INT_PATTERN = re.compile(rb"(?<!\d)-?\d+")
+_LINE_PATTERN = re.compile(rb"[^\n]+")
+_RECORD_PATTERN = re.compile(rb"[^\n]+(?:\n[^\n]+)*")
+
+
+def input_path(day_file: str, name: str = "input.txt") -> str:
+    """Returns the path of an input file next to the day's script, called with `__file__`."""
+    return os.path.join(os.path.dirname(os.path.abspath(day_file)), name)
+
+
+@contextmanager
+def map_input(path: str) -> Iterator[Buffer]:
+    """Memory maps the file read-only for the duration of the `with` block."""
+    with open(path, "rb") as f:
+        if not os.fstat(f.fileno()).st_size:
+            # empty files can not be memory mapped
+            yield b""
+            return
+
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mm
+        except BaseException:
+            # the traceback of an error can still hold views into the mapping, closing it would then
+            # hide the error behind a BufferError, so it is left for the last view to close instead
+            with suppress(BufferError):
+                mm.close()
+            raise
+        mm.close()
+
+
+def iter_lines(data: Buffer) -> Iterator[memoryview]:
+    """Lazily yields every non-empty line as a zero-copy view into `data`."""
+    view = memoryview(data)
+    return (view[m.start() : m.end()] for m in _LINE_PATTERN.finditer(data))
+
+
+def iter_records(data: Buffer) -> Iterator[memoryview]:
+    """Lazily yields every blank-line separated record as a zero-copy view into `data`."""
+    view = memoryview(data)
+    return (view[m.start() : m.end()] for m in _RECORD_PATTERN.finditer(data))
+
+
+def extract_ints(data: Buffer) -> List[int]:
+    """Returns every integer in `data` in order, in one regex scan."""
+    return list(map(int, _INT_PATTERN.findall(data)))
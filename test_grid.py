@@ -0,0 +1,38 @@
+import copy
+import pickle
+
+from grid import Grid
+
+
+def test_rows_and_columns_in_both_directions():
+    grid = Grid.from_digits(b"123\n456\n")
+
+    assert (grid.width, grid.height) == (3, 2)
+    assert [list(row) for row in grid.rows()] == [[1, 2, 3], [4, 5, 6]]
+    assert [list(row) for row in grid.rows(reverse=True)] == [[3, 2, 1], [6, 5, 4]]
+    assert [list(col) for col in grid.columns()] == [[1, 4], [2, 5], [3, 6]]
+    assert [list(col) for col in grid.columns(reverse=True)] == [[4, 1], [5, 2], [6, 3]]
+
+
+def test_views_follow_changes():
+    grid = Grid.from_rows([[1, 2], [3, 4]])
+    column = grid.column(1)
+    grid[1, 1] = 9
+
+    assert list(column) == [2, 9]
+
+
+def test_pickles_and_copies():
+    grid = Grid.from_rows([[1, 2, 3], [4, 5, 6]])
+
+    assert pickle.loads(pickle.dumps(grid)) == grid
+    copied = copy.deepcopy(grid)
+    copied[0, 0] = 7
+    assert list(copied.row(0)) == [7, 2, 3]
+    assert list(grid.row(0)) == [1, 2, 3]
+
+
+def test_empty_grids():
+    assert Grid.from_rows([]) == Grid(bytearray(), 0, 0)
+    assert Grid.from_digits(b"") == Grid(bytearray(), 0, 0)
+    assert list(Grid.from_rows([]).rows()) == []
@@ -0,0 +1,43 @@
+import pytest
+
+from puzzle_input import extract_ints, iter_lines, iter_records, map_input
+
+
+def test_lines_and_records_skip_blank_lines():
+    data = b"a b\n\n12\n3\n\n\nlast"
+
+    assert [bytes(line) for line in iter_lines(data)] == [b"a b", b"12", b"3", b"last"]
+    assert [bytes(record) for record in iter_records(data)] == [
+        b"a b",
+        b"12\n3",
+        b"last",
+    ]
+
+
+def test_extract_ints_reads_ranges_as_positive():
+    assert extract_ints(b"2-4,-6-8\nmove 10") == [2, 4, -6, 8, 10]
+
+
+def test_map_input(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"$ cd /\n$ ls\n")
+    empty = tmp_path / "empty.txt"
+    empty.write_bytes(b"")
+
+    with map_input(str(path)) as data:
+        assert [str(line, "ascii") for line in iter_lines(data)] == ["$ cd /", "$ ls"]
+    with map_input(str(empty)) as data:
+        assert list(iter_lines(data)) == []
+
+
+def test_map_input_keeps_errors_raised_while_views_are_alive(tmp_path):
+    path = tmp_path / "input.txt"
+    path.write_bytes(b"1\nx\n")
+
+    def _parse(lines):
+        return [int(bytes(line)) for line in lines]
+
+    # the traceback holds the line generator, and with it a view into the mapping
+    with pytest.raises(ValueError):
+        with map_input(str(path)) as data:
+            _parse(iter_lines(data))